@@ -1,5 +1,6 @@
 import base64
-from dash import Dash, html, dcc
+import diskcache
+from dash import Dash, DiskcacheManager, html, dcc
 import dash_bootstrap_components as dbc
 from pathlib import Path
 
@@ -7,16 +8,23 @@ from modules.charts.barchart import create_barchart_layout
 from modules.charts.activity_breakdown import create_activity_breakdown_layout
 from modules.charts.musclemap.musclemap import create_musclemap_layout
 from modules.utils import calculate_date_range, create_data_layout
+from modules.rollups import PRESET_RANGES
 from modules.callbacks.data_callbacks import register_data_callbacks
 from modules.callbacks.barchart_callbacks import register_barchart_callbacks
 from modules.callbacks.activity_breakdown_callbacks import register_activity_breakdown_callbacks
 from modules.callbacks.musclemap_callbacks import register_musclemap_callbacks
+from modules.callbacks.date_callbacks import register_date_callbacks
 
 THEME = dbc.themes.LUX
 
+# Long running work such as the Garmin download runs in background callbacks
+background_cache = diskcache.Cache('data/cache/background')
+background_callback_manager = DiskcacheManager(background_cache)
+
 app = Dash(__name__,
            external_stylesheets=[THEME],
-           suppress_callback_exceptions=True)
+           suppress_callback_exceptions=True,
+           background_callback_manager=background_callback_manager)
 
 first_day_last_month, last_day_last_month = calculate_date_range()
 
@@ -31,8 +39,9 @@ logo_image = html.Img(
 
 data_stores = html.Div([
     dcc.Store(id='stored-data', storage_type='local'),
-    dcc.Store(id='strength-data-store', storage_type='local'),
     dcc.Store(id='last-update-time', storage_type='local'),
+    dcc.Store(id='sync-state', storage_type='local'),
+    dcc.Store(id='has-data', data=False),
 ])
 
 floating_controls = dbc.Container([
@@ -71,6 +80,13 @@ floating_controls = dbc.Container([
                 end_date=last_day_last_month.date(),
                 className="mb-2"
             ),
+            dbc.RadioItems(
+                id='date-preset',
+                options=[{'label': label, 'value': days} for days, label in PRESET_RANGES.items()],
+                value=None,
+                inline=True,
+                className="small"
+            ),
         ])
     ], className="shadow-sm",
         style={
@@ -145,6 +161,7 @@ register_data_callbacks(app)
 register_barchart_callbacks(app)
 register_activity_breakdown_callbacks(app)
 register_musclemap_callbacks(app)
+register_date_callbacks(app)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
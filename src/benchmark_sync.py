@@ -0,0 +1,90 @@
+"""Measure Garmin sync throughput against the local Garmin stand-in.
+
+Run from the project root, like the app:
+
+    python3 ./src/benchmark_sync.py --sizes 1000 10000 100000 --latency 0.2
+
+Each run goes through the same path as the Fetch Data button: paging,
+projection, raw archive, typed frame and dataset store. Throughput is timed
+without tracing. Peak memory comes from a second pass with tracemalloc and
+no simulated latency, because tracing slows everything down.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from modules.dataset_store import DatasetStore
+from modules.data_loader import sync_garmin_dataset
+from modules.garmin_fake import FakeGarmin, load_fixture_activities, synthetic_activities
+from modules.garmin_sync import MAX_CONCURRENT_PAGES, REQUESTS_PER_SECOND, TokenBucket, summarize_page_timings
+
+
+def run_sync(activities, concurrency, rate=None, trace_memory=False, **client_options):
+    """Sync all activities into a throwaway dataset store and return timing and memory figures"""
+    api = FakeGarmin(activities=activities, seed=0, **client_options)
+    page_timings = []
+    directory = tempfile.mkdtemp(prefix='pfifa-bench-')
+    store = DatasetStore(directory)
+    peak = None
+
+    try:
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        api.login()
+        _, _, fetched_count = sync_garmin_dataset(
+            api, store.new_dataset_id(), store=store, max_workers=concurrency,
+            bucket=TokenBucket(rate) if rate else None, page_timings=page_timings
+        )
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'activities': fetched_count,
+        'requests': api.request_count,
+        'seconds': elapsed,
+        'peak_mb': None if peak is None else peak / 2 ** 20,
+        'pages': summarize_page_timings(page_timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Garmin sync path against a local stand-in")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds per page request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds per page request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="probability of a failed page request")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="probability of a 429 response")
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND,
+                        help="token bucket requests per second, 0 for no pacing")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_PAGES,
+                        help="page requests in flight at once")
+    parser.add_argument('--skip-memory', action='store_true', help="skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    templates = load_fixture_activities()
+
+    print(f"{'activities':>10} {'requests':>9} {'retries':>8} {'seconds':>9} {'act/s':>10} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'peak MB':>9}")
+    for size in args.sizes:
+        activities = synthetic_activities(size, templates)
+        timing = run_sync(activities, args.concurrency, args.rate, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+        memory = None if args.skip_memory else run_sync(activities, args.concurrency, trace_memory=True)
+
+        throughput = timing['activities'] / timing['seconds'] if timing['seconds'] else float('inf')
+        pages = timing['pages'] or {'retries': 0, 'p50_seconds': 0.0, 'p95_seconds': 0.0}
+        peak_mb = f"{memory['peak_mb']:>9.1f}" if memory else f"{'-':>9}"
+        print(f"{timing['activities']:>10} {timing['requests']:>9} {pages['retries']:>8} {timing['seconds']:>9.2f} "
+              f"{throughput:>10.0f} {pages['p50_seconds'] * 1000:>8.1f} {pages['p95_seconds'] * 1000:>8.1f} {peak_mb}")
+
+
+if __name__ == '__main__':
+    main()
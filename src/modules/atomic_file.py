@@ -0,0 +1,25 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_writer(path, mode=0o666):
+    """Open a temporary file for binary writing and move it over path once the block succeeds.
+
+    Readers only ever see the previous or the complete new file. The
+    temporary file is removed when the block or the move fails.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_atomic(path, data, mode=0o666):
+    with atomic_writer(path, mode) as f:
+        f.write(data)
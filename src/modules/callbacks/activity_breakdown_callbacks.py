@@ -1,5 +1,6 @@
 from dash import Input, Output
-import pandas as pd
+from modules.dataset_store import load_dataset
+from modules.utils import only_triggered_by
 
 def register_activity_breakdown_callbacks(app):
     @app.callback(
@@ -18,30 +19,35 @@ def register_activity_breakdown_callbacks(app):
             return create_activity_breakdown_chart(None, selected_metric, colorblind_enabled)
 
         try:
-            if isinstance(stored_data, str):
-                df = pd.DataFrame(json.loads(stored_data))
-            else:
-                df = pd.DataFrame(stored_data)
+            dataset = load_dataset(stored_data)
+            if dataset is None:
+                from modules.charts.activity_breakdown import create_activity_breakdown_chart
+                return create_activity_breakdown_chart(None, selected_metric, colorblind_enabled)
 
-            df['startTimeLocal'] = pd.to_datetime(df['startTimeLocal'])
+            totals = dataset.rollups.between(start_date, end_date)
 
-            mask = (df['startTimeLocal'] >= start_date) & (df['startTimeLocal'] <= end_date)
-            filtered_df = df.loc[mask]
+            # The colour scheme alone only recolours the slices of a drawn donut
+            if len(totals) and only_triggered_by({'global-colorblind-toggle.value'}):
+                from modules.charts.activity_breakdown import patch_activity_breakdown_colors
+                return patch_activity_breakdown_colors(colorblind_enabled)
 
             from modules.charts.activity_breakdown import create_activity_breakdown_chart
-            return create_activity_breakdown_chart(filtered_df, selected_metric, colorblind_enabled)
+            return create_activity_breakdown_chart(totals, selected_metric, colorblind_enabled)
 
         except Exception as e:
             print(f"Error updating activity breakdown: {e}")
             from modules.charts.activity_breakdown import create_activity_breakdown_chart
             return create_activity_breakdown_chart(None, selected_metric, colorblind_enabled)
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function toggleBreakdownMetricSelector(hasData) {
+            if (hasData) {
+                return {'marginBottom': '20px', 'marginTop': '10px', 'display': 'block'};
+            }
+            return {'display': 'none'};
+        }
+        """,
         Output('breakdown-metric-container', 'style'),
-        [Input('stored-data', 'data')]
-    )
-    def toggle_breakdown_metric_selector(stored_data):
-        if stored_data:
-            return {'marginBottom': '20px', 'marginTop': '10px', 'display': 'block'}
-        else:
-            return {'display': 'none'}
\ No newline at end of file
+        [Input('has-data', 'data')]
+    )
\ No newline at end of file
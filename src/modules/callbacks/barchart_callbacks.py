@@ -1,11 +1,19 @@
-from dash import Input, Output, State, callback_context, html, dcc, ALL
-import pandas as pd
-from modules.charts.barchart import create_activity_chart, get_default_goals, get_metric_units, create_summary_chart, METRIC_LABEL_MAP, create_empty_chart
+from dash import Input, Output, State, callback_context, html, dcc, ALL, Patch, no_update
+from dash.exceptions import PreventUpdate
+from modules.charts.barchart import (create_activity_chart, create_bucketed_activity_chart, get_default_goals, get_metric_units,
+                                     create_summary_chart, METRIC_LABEL_MAP, create_empty_chart, resolve_bucket,
+                                     bucket_values, patch_goal_bar_figure, patch_summary_chart)
+from modules.dataset_store import load_dataset
+from modules.utils import only_triggered_by
 import json
 
+# Goal edits and the colour scheme only recolour bars and move goal lines, so they patch the figures
+GOAL_PATCH_TRIGGERS = {'changed-goals.data', 'global-colorblind-toggle.value'}
+
 def register_barchart_callbacks(app):
     @app.callback(
         [Output('stored-goals', 'data'),
+         Output('changed-goals', 'data'),
          Output('current-goals-display', 'children'),
          Output({'type': 'goal-input', 'metric': ALL}, 'value')],
         [Input('reset-goals-button', 'n_clicks'),
@@ -15,42 +23,46 @@ def register_barchart_callbacks(app):
          State('stored-goals', 'data')]
     )
     def update_goals(reset_clicks, goal_values, input_ids, selected_metric, stored_goals):
+        """Keep goals, the goals table and the quick-set input in sync.
+
+        The table is only built on the first call. An edit patches the one
+        changed goal into the store and mirrors it into the other input of the
+        same metric; every other input is left as it is.
+        """
         ctx = callback_context
+        defaults = get_default_goals()
+        stored_goals = stored_goals or defaults
         if not ctx.triggered:
-            updated_values = []
-            for input_id in input_ids:
-                if input_id['metric'] == 'quick-set':
-                    updated_values.append(stored_goals.get(selected_metric, get_default_goals()[selected_metric]))
-                else:
-                    updated_values.append(stored_goals.get(input_id['metric'], get_default_goals()[input_id['metric']]))
-            return stored_goals, create_goals_display(stored_goals), updated_values
+            return (no_update, no_update, create_goals_display(stored_goals),
+                    goal_input_values(input_ids, stored_goals, selected_metric))
 
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
         if trigger_id == 'reset-goals-button':
-            stored_goals = get_default_goals()
-        else:
-            stored_goals = stored_goals or get_default_goals()
-            trigger_dict = json.loads(trigger_id)
-
-            trigger_index = next(i for i, id_dict in enumerate(input_ids) if id_dict == trigger_dict)
-            new_value = goal_values[trigger_index]
-
-            if new_value is not None:
-                metric = trigger_dict['metric']
-                if metric == 'quick-set':
-                    stored_goals[selected_metric] = float(new_value)
-                else:
-                    stored_goals[metric] = float(new_value)
-
-        updated_values = []
-        for input_id in input_ids:
-            if input_id['metric'] == 'quick-set':
-                updated_values.append(stored_goals.get(selected_metric, get_default_goals()[selected_metric]))
-            else:
-                updated_values.append(stored_goals.get(input_id['metric'], get_default_goals()[input_id['metric']]))
-
-        return stored_goals, create_goals_display(stored_goals), updated_values
+            changed = {metric: value for metric, value in defaults.items() if stored_goals.get(metric) != value}
+            values = goal_input_values(input_ids, defaults, selected_metric)
+            if not changed:
+                return no_update, no_update, no_update, values
+            return defaults, {'goals': changed}, no_update, values
+
+        trigger_dict = json.loads(trigger_id)
+        trigger_index = next(i for i, id_dict in enumerate(input_ids) if id_dict == trigger_dict)
+        new_value = goal_values[trigger_index]
+        metric = selected_metric if trigger_dict['metric'] == 'quick-set' else trigger_dict['metric']
+        if new_value is None or stored_goals.get(metric) == float(new_value):
+            raise PreventUpdate
+
+        goal = float(new_value)
+        patched_goals = Patch()
+        patched_goals[metric] = goal
+
+        values = [no_update] * len(input_ids)
+        for i, input_id in enumerate(input_ids):
+            mirrors = input_id['metric'] == metric or (input_id['metric'] == 'quick-set' and metric == selected_metric)
+            if mirrors and i != trigger_index:
+                values[i] = goal
+
+        return patched_goals, {'goals': {metric: goal}}, no_update, values
 
     # Add callback for colorblind mode toggle
     @app.callback(
@@ -60,15 +72,20 @@ def register_barchart_callbacks(app):
     def update_colorblind_mode(value):
         return True if value else False
 
-    @app.callback(
+    # Layout toggles only flip styles, so they run in the browser without a server round trip
+    app.clientside_callback(
+        """
+        function switchLayoutVisibility(hasData) {
+            if (!hasData) {
+                return [{'display': 'block'}, {'display': 'none'}];
+            }
+            return [{'display': 'none'}, {'display': 'block'}];
+        }
+        """,
         [Output('initial-loading-div', 'style'),
          Output('data-loaded-div', 'style')],
-        [Input('stored-data', 'data')]
+        [Input('has-data', 'data')]
     )
-    def switch_layout_visibility(stored_data):
-        if not stored_data:
-            return {'display': 'block'}, {'display': 'none'}
-        return {'display': 'none'}, {'display': 'block'}
 
     @app.callback(
         Output("activity-graph", "figure"),
@@ -76,23 +93,41 @@ def register_barchart_callbacks(app):
          Input('metric-selector', 'value'),
          Input('date-range', 'start_date'),
          Input('date-range', 'end_date'),
-         Input('stored-goals', 'data'),
-         Input('global-colorblind-toggle', 'value')]
+         Input('changed-goals', 'data'),
+         Input('global-colorblind-toggle', 'value'),
+         Input('bucket-selector', 'value')],
+        [State('stored-goals', 'data')]
     )
-    def update_activity_graph(data, selected_metric, start_date, end_date, stored_goals, colorblind_mode):
+    def update_activity_graph(data, selected_metric, start_date, end_date, changed_goals, colorblind_mode, bucket_mode,
+                              stored_goals):
+        if callback_context.triggered_id == 'changed-goals' and selected_metric not in changed_goals['goals']:
+            raise PreventUpdate
         if data is None:
             return create_empty_chart("Waiting for you to add<br>your personal fitness data")
 
         colorblind_enabled = bool(colorblind_mode and True in colorblind_mode)
 
         try:
-            if isinstance(data, str):
-                df = pd.read_json(data)
-            else:
-                df = pd.DataFrame(data)
+            dataset = load_dataset(data)
+            if dataset is None:
+                return create_empty_chart("Waiting for you to add<br>your personal fitness data")
 
             goal_value = stored_goals.get(selected_metric, get_default_goals()[selected_metric])
-            return create_activity_chart(df, selected_metric, start_date, end_date, goal_value, colorblind_enabled)
+            activities = dataset.between(start_date, end_date)
+            bucket = resolve_bucket(bucket_mode, len(activities), start_date, end_date)
+            patch = only_triggered_by(GOAL_PATCH_TRIGGERS)
+            if bucket == 'activity':
+                values = dataset.goals.column(selected_metric, start_date, end_date)
+                if patch and len(activities):
+                    return patch_goal_bar_figure(values, goal_value, colorblind_enabled)
+                return create_activity_chart(activities, selected_metric, start_date, end_date,
+                                             goal_value, colorblind_enabled, values=values)
+
+            buckets = dataset.rollups.buckets(bucket, selected_metric, start_date, end_date)
+            if patch and len(buckets):
+                return patch_goal_bar_figure(bucket_values(buckets), goal_value, colorblind_enabled)
+            return create_bucketed_activity_chart(buckets, bucket, selected_metric, start_date, end_date,
+                                                  goal_value, colorblind_enabled)
         except Exception as e:
             print(f"Error updating activity graph: {e}")
             return create_empty_chart("Error loading data")
@@ -102,25 +137,33 @@ def register_barchart_callbacks(app):
         [Input('stored-data', 'data'),
          Input('date-range', 'start_date'),
          Input('date-range', 'end_date'),
-         Input('stored-goals', 'data'),
+         Input('changed-goals', 'data'),
          Input('summary-type', 'value'),
          Input('summary-metrics-selector', 'value'),
-         Input('global-colorblind-toggle', 'value')]
+         Input('global-colorblind-toggle', 'value')],
+        [State('stored-goals', 'data')]
     )
-    def update_summary_graph(data, start_date, end_date, stored_goals, summary_type, selected_metrics, colorblind_mode):
+    def update_summary_graph(data, start_date, end_date, changed_goals, summary_type, selected_metrics, colorblind_mode,
+                             stored_goals):
+        metrics_to_show = None if summary_type == 'all' else selected_metrics
+        if (callback_context.triggered_id == 'changed-goals' and metrics_to_show
+                and not set(metrics_to_show) & set(changed_goals['goals'])):
+            raise PreventUpdate
         if data is None:
             return create_empty_chart("Waiting for you to add<br>your personal fitness data")
 
         colorblind_enabled = bool(colorblind_mode and True in colorblind_mode)
 
         try:
-            if isinstance(data, str):
-                df = pd.DataFrame(json.loads(data))
-            else:
-                df = pd.DataFrame(data)
+            dataset = load_dataset(data)
+            if dataset is None:
+                return create_empty_chart("Waiting for you to add<br>your personal fitness data")
 
-            metrics_to_show = None if summary_type == 'all' else selected_metrics
-            return create_summary_chart(df, start_date, end_date, stored_goals, metrics_to_show, colorblind_enabled)
+            means = dataset.rollups.means(start_date, end_date)
+            status_counts = dataset.goals.status_counts(stored_goals, start_date, end_date)
+            if only_triggered_by(GOAL_PATCH_TRIGGERS):
+                return patch_summary_chart(means, stored_goals, metrics_to_show, colorblind_enabled, status_counts)
+            return create_summary_chart(means, stored_goals, metrics_to_show, colorblind_enabled, status_counts)
         except Exception as e:
             print(f"Error updating summary graph: {e}")
             return create_empty_chart("Error loading data")
@@ -136,7 +179,30 @@ def register_barchart_callbacks(app):
             return get_default_goals()[selected_metric]
         return stored_goals.get(selected_metric, get_default_goals()[selected_metric])
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function toggleView(nClicks, currentView) {
+            const detail = [
+                {'display': 'block'},
+                {'display': 'none'},
+                'detail',
+                {'width': '50%', 'marginBottom': '20px', 'display': 'block'},
+                {'display': 'block'},
+                {'display': 'none'}
+            ];
+            if (nClicks === null || nClicks === undefined || currentView !== 'detail') {
+                return detail;
+            }
+            return [
+                {'display': 'none'},
+                {'display': 'block'},
+                'summary',
+                {'width': '50%', 'marginBottom': '20px', 'display': 'none'},
+                {'display': 'none'},
+                {'display': 'block'}
+            ];
+        }
+        """,
         [Output('activity-graph', 'style'),
          Output('summary-graph', 'style'),
          Output('view-type', 'data'),
@@ -146,49 +212,40 @@ def register_barchart_callbacks(app):
         [Input('toggle-summary-view', 'n_clicks')],
         [State('view-type', 'data')]
     )
-    def toggle_view(n_clicks, current_view):
-        if n_clicks is None:
-            return ({'display': 'block'},
-                    {'display': 'none'},
-                    'detail',
-                    {'width': '50%', 'marginBottom': '20px', 'display': 'block'},
-                    {'display': 'block'},
-                    {'display': 'none'})
-
-        if current_view == 'detail':
-            return ({'display': 'none'},
-                    {'display': 'block'},
-                    'summary',
-                    {'width': '50%', 'marginBottom': '20px', 'display': 'none'},
-                    {'display': 'none'},
-                    {'display': 'block'})
-        else:
-            return ({'display': 'block'},
-                    {'display': 'none'},
-                    'detail',
-                    {'width': '50%', 'marginBottom': '20px', 'display': 'block'},
-                    {'display': 'block'},
-                    {'display': 'none'})
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function toggleMetricsDropdown(summaryType) {
+            return summaryType === 'custom' ? {'display': 'block'} : {'display': 'none'};
+        }
+        """,
         Output('summary-metrics-dropdown', 'style'),
         [Input('summary-type', 'value')]
     )
-    def toggle_metrics_dropdown(summary_type):
-        if summary_type == 'custom':
-            return {'display': 'block'}
-        return {'display': 'none'}
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function toggleGoalsCollapse(nClicks, isOpen) {
+            if (nClicks === null || nClicks === undefined) {
+                return [true, '⯆'];
+            }
+            return [!isOpen, !isOpen ? '⯆' : '⯈'];
+        }
+        """,
         [Output('goals-collapse', 'is_open'),
          Output('collapse-goals-button', 'children')],
         [Input('collapse-goals-button', 'n_clicks')],
         [State('goals-collapse', 'is_open')]
     )
-    def toggle_goals_collapse(n_clicks, is_open):
-        if n_clicks is None:
-            return True, '⯆'
-        return not is_open, '⯆' if not is_open else '⯈'
+
+def goal_input_values(input_ids, goals, selected_metric):
+    """Values for every goal input, the quick-set input shows the goal of the selected metric"""
+    defaults = get_default_goals()
+    values = []
+    for input_id in input_ids:
+        metric = selected_metric if input_id['metric'] == 'quick-set' else input_id['metric']
+        values.append(goals.get(metric, defaults[metric]))
+    return values
 
 def create_goals_display(goals):
     """Create a formatted display of all current goals with editable inputs"""
@@ -216,6 +273,7 @@ def create_goals_display(goals):
                     id={'type': 'goal-input', 'metric': metric},
                     type='number',
                     value=value,
+                    debounce=True,
                     style={
                         'width': '100px',
                         'padding': '5px',
@@ -1,80 +1,60 @@
 import dash
-from dash import Input, Output, State, html
-import pandas as pd
-import json
-import base64
+from dash import Input, Output, State, dcc
 from datetime import datetime
-from garminconnect import Garmin
+from modules.garmin_sync import get_sync_marker, summarize_page_timings, TokenBucket
+from modules.garmin_session import run_with_garmin_session
+from modules.data_loader import merge_activity_frames, parse_uploaded_exports, sync_garmin_dataset
+from modules.dataset_store import DATASET_STORE, get_dataset_id, load_frame
+from modules.sync_checkpoint import SyncCheckpoint, delete_checkpoint
+from modules.data_export import EXPORT_FORMATS, filter_activity_frame, filter_records, write_json, write_jsonl_gz, write_npz
+from modules.charts.activity_breakdown import ACTIVITY_TYPE_LABELS
+
+def print_page_timings(page_timings):
+    summary = summarize_page_timings(page_timings)
+    if summary:
+        print(f"Garmin sync: {summary['pages']} pages, {summary['retries']} retries, "
+              f"p50 {summary['p50_seconds']:.2f}s, p95 {summary['p95_seconds']:.2f}s, "
+              f"max {summary['max_seconds']:.2f}s, {summary['retry_wait_seconds']:.1f}s waiting on retries")
 
 def register_data_callbacks(app):
-    @app.callback(
-        [Output('download-section', 'style', allow_duplicate=True),
-         Output('clear-data-section', 'style', allow_duplicate=True),
-         Output('last-update-display', 'children', allow_duplicate=True),
-         Output('data-status-container', 'children', allow_duplicate=True),
-         Output('garmin-login', 'style', allow_duplicate=True),
-         Output('file-upload', 'style', allow_duplicate=True)],
-        [Input('stored-data', 'modified_timestamp'),
-         Input('last-update-time', 'data'),
-         Input('data-source', 'value')],
-        [State('stored-data', 'data')],
-        prevent_initial_call=True
-    )
-    def update_all_ui_elements(ts, last_update, data_source, stored_data):
-        display_style = {'marginTop': '20px', 'display': 'block'} if stored_data else {'display': 'none'}
-
-        garmin_style = {'display': 'block'} if data_source == 'garmin' else {'display': 'none'}
-        file_style = {'display': 'block'} if data_source != 'garmin' else {'display': 'none'}
-
-        message_style = {
-            'fontWeight': '500',
-            'padding': '10px',
-            'borderRadius': '4px',
-            'textAlign': 'center',
-            'width': '100%'
+    app.clientside_callback(
+        """
+        function updateDataStatus(hasData) {
+            const messageStyle = {
+                'fontWeight': '500',
+                'padding': '10px',
+                'borderRadius': '4px',
+                'textAlign': 'center',
+                'width': '100%'
+            };
+            const message = hasData
+                ? {text: 'Data loaded successfully.', color: '#28a745', backgroundColor: '#f8f9f8'}
+                : {text: 'Ready to fetch data', color: '#6c757d', backgroundColor: '#f8f9fa'};
+            return {
+                namespace: 'dash_html_components',
+                type: 'Div',
+                props: {
+                    children: message.text,
+                    style: {...messageStyle, color: message.color, backgroundColor: message.backgroundColor}
+                }
+            };
         }
-
-        last_update_text = f"Last updated: {last_update}" if last_update else ""
-
-        if stored_data:
-            status_message = html.Div("Data loaded successfully.",
-                                      style={
-                                          **message_style,
-                                          'color': '#28a745',  # Bootstrap success green
-                                          'backgroundColor': '#f8f9f8'
-                                      })
-        else:
-            status_message = html.Div("Ready to fetch data",
-                                      style={
-                                          **message_style,
-                                          'color': '#6c757d',  # Bootstrap secondary gray
-                                          'backgroundColor': '#f8f9fa'
-                                      })
-
-        return (
-            display_style,
-            display_style,
-            last_update_text,
-            status_message,
-            garmin_style,
-            file_style
-        )
+        """,
+        Output('data-status-container', 'children'),
+        Input('has-data', 'data')
+    )
 
     @app.callback(
         [Output('stored-data', 'data'),
-         Output('strength-data-store', 'data'),
          Output('last-update-time', 'data'),
+         Output('sync-state', 'data'),
          Output('upload-data', 'contents')],
-        [Input('fetch-button', 'n_clicks'),
-         Input('upload-data', 'contents'),
+        [Input('upload-data', 'contents'),
          Input('clear-data-button', 'n_clicks')],
-        [State('garmin-email', 'value'),
-         State('garmin-password', 'value'),
-         State('data-source', 'value'),
-         State('upload-data', 'filename')]
+        [State('upload-data', 'filename'),
+         State('stored-data', 'data')]
     )
-    def update_data(n_clicks, upload_contents, clear_clicks,
-                    username, password, data_source, filename):
+    def update_data(upload_contents, clear_clicks, filename, stored_data):
         ctx = dash.callback_context
         if not ctx.triggered:
             raise dash.exceptions.PreventUpdate
@@ -82,131 +62,220 @@ def register_data_callbacks(app):
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
         if trigger_id == 'clear-data-button' and clear_clicks:
+            DATASET_STORE.delete(stored_data)
+            if stored_data:
+                delete_checkpoint(stored_data.get('dataset_id'))
             return None, None, None, None
 
         if trigger_id == 'upload-data' and upload_contents:
             try:
-                content_type, content_string = upload_contents.split(',')
-                decoded = base64.b64decode(content_string)
-
-                if 'json' in filename.lower():
-                    data = json.loads(decoded)
-                    all_activities = []
-                    strength_activities = []
-
-                    activities_list = data if isinstance(data, list) else [data]
+                contents_list = upload_contents if isinstance(upload_contents, list) else [upload_contents]
+                filenames = filename if isinstance(filename, list) else [filename]
 
-                    for activity in activities_list:
-                        if 'summarizedExerciseSets' in activity:
-                            strength_activities.append(activity)
-                        all_activities.append(activity)
+                uploaded_df, raw_members, skipped = parse_uploaded_exports(contents_list, filenames)
+                if skipped:
+                    print(f"Skipped unsupported files: {', '.join(skipped)}")
+                if uploaded_df is None:
+                    return dash.no_update, dash.no_update, dash.no_update, None
 
-                    activities_df = pd.DataFrame(all_activities)
-                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                dataset_id = get_dataset_id(stored_data)
+                activities_df = merge_activity_frames(load_frame(stored_data), uploaded_df)
+                for member in raw_members:
+                    DATASET_STORE.append_archive_member(dataset_id, member)
 
-                    return (
-                        activities_df.to_dict('records'),
-                        json.dumps(strength_activities),
-                        current_time,
-                        None
-                    )
-                else:
-                    return None, None, None, None
-
-            except Exception as e:
-                print(f"Error processing file: {str(e)}")
-                return None, None, None, None
-
-        if trigger_id == 'fetch-button' and n_clicks:
-            if not username or not password:
-                return None, None, None, dash.no_update
-
-            try:
-                api = Garmin(username, password)
-                api.login()
-
-                start = 0
-                limit = 100
-                all_activities = []
-                strength_activities = []
-                more_activities = True
-
-                while more_activities:
-                    batch = api.get_activities(start, limit)
-                    if not batch:
-                        break
-
-                    for activity in batch:
-                        if activity.get('activityType', {}).get('typeKey') == 'strength_training':
-                            strength_activities.append(activity)
-                        all_activities.append(activity)
-
-                    if len(batch) < limit:
-                        break
-                    start += limit
-
-                activities_df = pd.DataFrame(all_activities)
                 current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
                 return (
-                    activities_df.to_dict('records'),
-                    json.dumps(strength_activities),
+                    DATASET_STORE.put(dataset_id, activities_df),
                     current_time,
-                    dash.no_update
+                    get_sync_marker(activities_df[['startTimeGMT', 'activityId']].to_dict('records')),
+                    None
                 )
 
             except Exception as e:
-                return None, None, None, dash.no_update
+                print(f"Error processing file: {str(e)}")
+                return dash.no_update, dash.no_update, dash.no_update, None
 
         raise dash.exceptions.PreventUpdate
 
+    @app.callback(
+        [Output('stored-data', 'data', allow_duplicate=True),
+         Output('last-update-time', 'data', allow_duplicate=True),
+         Output('sync-state', 'data', allow_duplicate=True)],
+        Input('fetch-button', 'n_clicks'),
+        [State('garmin-email', 'value'),
+         State('garmin-password', 'value'),
+         State('incremental-sync', 'value'),
+         State('sync-state', 'data'),
+         State('stored-data', 'data')],
+        background=True,
+        progress=[Output('fetch-progress', 'children'),
+                  Output('fetch-partial-data', 'data')],
+        running=[(Output('fetch-button', 'disabled'), True, False),
+                 (Output('cancel-fetch-button', 'style'),
+                  {'display': 'inline-block', 'margin-top': '10px', 'margin-left': '10px'},
+                  {'display': 'none'})],
+        cancel=[Input('cancel-fetch-button', 'n_clicks')],
+        prevent_initial_call=True
+    )
+    def fetch_garmin_activities(set_progress, n_clicks, username, password, incremental_mode, sync_state, stored_data):
+        """Download activities in a background worker, publishing the dataset while pages arrive"""
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        if not username or not password:
+            return None, None, None
+
+        published = {'ref': None}
+        page_timings = []
+
+        def report_progress(fetched_count, ref):
+            published['ref'] = ref
+            set_progress((f"{fetched_count} activities fetched", ref))
+
+        try:
+            existing_df = load_frame(stored_data)
+            incremental = bool(incremental_mode and True in incremental_mode and existing_df is not None and sync_state)
+            dataset_id = get_dataset_id(stored_data)
+
+            def sync(api):
+                page_timings.clear()
+                return sync_garmin_dataset(
+                    api,
+                    dataset_id,
+                    existing_df=existing_df,
+                    sync_marker=sync_state if incremental else None,
+                    on_progress=report_progress,
+                    checkpoint=SyncCheckpoint(dataset_id, username, sync_state if incremental else None),
+                    bucket=TokenBucket(),
+                    page_timings=page_timings
+                )
+
+            ref, activities_df, fetched_count = run_with_garmin_session(username, password, sync)
+            print_page_timings(page_timings)
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            if ref is None:
+                set_progress(("No new activities", None))
+                return dash.no_update, current_time, dash.no_update
+
+            return (
+                ref,
+                current_time,
+                get_sync_marker(activities_df[['startTimeGMT', 'activityId']].to_dict('records'))
+            )
+
+        except Exception as e:
+            print(f"Error fetching Garmin data: {e}")
+            print_page_timings(page_timings)
+            if published['ref'] is not None:
+                # Keep whatever was published before the failure, the next fetch downloads everything again
+                return published['ref'], datetime.now().strftime("%Y-%m-%d %H:%M:%S"), None
+            return dash.no_update, dash.no_update, dash.no_update
+
+    @app.callback(
+        Output('stored-data', 'data', allow_duplicate=True),
+        Input('fetch-partial-data', 'data'),
+        State('stored-data', 'data'),
+        prevent_initial_call=True
+    )
+    def publish_partial_data(partial_data, stored_data):
+        if not partial_data or partial_data == stored_data:
+            raise dash.exceptions.PreventUpdate
+        return partial_data
+
     @app.callback(
         Output("download-data", "data"),
         Input("btn-download", "n_clicks"),
         [State("download-type", "value"),
-         State("stored-data", "data"),
-         State("strength-data-store", "data")],
+         State("export-format", "value"),
+         State("export-activity-types", "value"),
+         State("export-date-filter", "value"),
+         State("date-range", "start_date"),
+         State("date-range", "end_date"),
+         State("stored-data", "data")],
         prevent_initial_call=True
     )
-    def download_data(n_clicks, download_type, all_data, strength_data):
-        if not n_clicks:
+    def download_data(n_clicks, download_type, export_format, activity_types, date_filter,
+                      start_date, end_date, all_data):
+        if not n_clicks or not all_data:
             raise dash.exceptions.PreventUpdate
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        export_format = export_format if export_format in EXPORT_FORMATS else 'json'
+        filters = dict(
+            start_date=start_date if date_filter and True in date_filter else None,
+            end_date=end_date if date_filter and True in date_filter else None,
+            activity_types=activity_types or None,
+            strength_only=download_type == 'strength'
+        )
 
-        if download_type == 'all' and all_data:
-            return dict(
-                content=json.dumps(all_data, indent=2),
-                filename=f"garmin_activities_{timestamp}.json"
-            )
-        elif download_type == 'strength' and strength_data:
-            return dict(
-                content=strength_data,
-                filename=f"garmin_strength_activities_{timestamp}.json"
-            )
+        prefix = "garmin_strength_activities" if download_type == 'strength' else "garmin_activities"
+        filename = f"{prefix}_{timestamp}.{EXPORT_FORMATS[export_format]['extension']}"
 
-        return None
+        if export_format == 'npz':
+            activities_df = load_frame(all_data)
+            if activities_df is None:
+                return None
+            selected_df = filter_activity_frame(activities_df, **filters)
+            return dcc.send_bytes(lambda buffer: write_npz(selected_df, buffer), filename)
+
+        # JSON exports are rebuilt from the raw archive so they keep every Garmin field
+        records = filter_records(DATASET_STORE.iter_raw_records(all_data), **filters)
+        writer = write_jsonl_gz if export_format == 'jsonl.gz' else write_json
+        return dcc.send_bytes(lambda buffer: writer(records, buffer), filename)
 
     @app.callback(
+        Output('export-activity-types', 'options'),
+        Input('stored-data', 'data')
+    )
+    def update_export_activity_types(stored_data):
+        activities_df = load_frame(stored_data)
+        if activities_df is None:
+            return []
+
+        type_keys = activities_df['activity_type'].dropna().unique()
+        return [{'label': ACTIVITY_TYPE_LABELS.get(key, key.replace('_', ' ').title()), 'value': key}
+                for key in sorted(type_keys)]
+
+    # UI toggles run in the browser and only read the has-data flag, never the dataset reference
+    app.clientside_callback(
+        """
+        function updateHasData(storedData) {
+            return Boolean(storedData);
+        }
+        """,
+        Output('has-data', 'data'),
+        Input('stored-data', 'data')
+    )
+
+    app.clientside_callback(
+        """
+        function toggleInputVisibility(dataSource) {
+            if (dataSource === 'garmin') {
+                return [{'display': 'block'}, {'display': 'none'}];
+            }
+            return [{'display': 'none'}, {'display': 'block'}];
+        }
+        """,
         [Output('garmin-login', 'style'),
          Output('file-upload', 'style')],
         [Input('data-source', 'value')]
     )
-    def toggle_input_visibility(data_source):
-        if data_source == 'garmin':
-            return {'display': 'block'}, {'display': 'none'}
-        return {'display': 'none'}, {'display': 'block'}
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function updateUiElements(hasData, lastUpdate) {
+            if (hasData) {
+                const displayStyle = {'marginTop': '20px', 'display': 'block'};
+                const lastUpdateText = lastUpdate ? `Last updated: ${lastUpdate}` : '';
+                return [displayStyle, displayStyle, lastUpdateText];
+            }
+            return [{'display': 'none'}, {'display': 'none'}, ''];
+        }
+        """,
         [Output('download-section', 'style'),
          Output('clear-data-section', 'style'),
          Output('last-update-display', 'children')],
-        [Input('stored-data', 'data'),
+        [Input('has-data', 'data'),
          Input('last-update-time', 'data')]
-    )
-    def update_ui_elements(data, last_update):
-        if data:
-            display_style = {'marginTop': '20px', 'display': 'block'}
-            last_update_text = f"Last updated: {last_update}" if last_update else ""
-            return display_style, display_style, last_update_text
-        return {'display': 'none'}, {'display': 'none'}, ""
\ No newline at end of file
+    )
\ No newline at end of file
@@ -0,0 +1,29 @@
+import dash
+from dash import Input, Output
+from modules.rollups import PRESET_RANGES, preset_range
+
+def register_date_callbacks(app):
+    @app.callback(
+        [Output('date-range', 'start_date'),
+         Output('date-range', 'end_date'),
+         Output('date-preset', 'value')],
+        [Input('date-preset', 'value'),
+         Input('date-range', 'start_date'),
+         Input('date-range', 'end_date')],
+        prevent_initial_call=True
+    )
+    def sync_date_preset(preset_days, start_date, end_date):
+        """Apply a chosen preset range, or clear the preset once the dates are picked by hand"""
+        trigger_id = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+
+        if trigger_id == 'date-preset':
+            if preset_days not in PRESET_RANGES:
+                raise dash.exceptions.PreventUpdate
+            start, end = preset_range(preset_days)
+            return start, end, dash.no_update
+
+        matching = next((days for days in PRESET_RANGES
+                         if preset_range(days) == (str(start_date)[:10], str(end_date)[:10])), None)
+        if matching == preset_days:
+            raise dash.exceptions.PreventUpdate
+        return dash.no_update, dash.no_update, matching
@@ -1,102 +1,91 @@
-from dash import Input, Output, State
+from collections import OrderedDict
+from dash import Input, Output, State, no_update
+from flask import send_from_directory
 import json
-import datetime
-import os
-from modules.charts.musclemap import musclemap_load, musclemap_plot
+import threading
+from modules.charts.musclemap import musclemap_plot
+from modules.dataset_store import load_dataset
+from modules.utils import only_triggered_by
+
+# Rendered muscle maps by dataset version, date range and colour scheme, so flipping the
+# colour scheme back and forth does not render the matplotlib figure again
+MAX_CACHED_MUSCLE_MAPS = 16
+MUSCLE_MAP_CACHE = OrderedDict()
+MUSCLE_MAP_CACHE_LOCK = threading.Lock()
+
+PLACEHOLDER_ROUTE = '/placeholders'
+PLACEHOLDER_MAX_AGE = 7 * 24 * 3600  # file names change with their content, so browsers may keep them
 
 def register_musclemap_callbacks(app):
+    # Empty muscle maps are static files, rendered at the first start and cached by the browser
+    musclemap_plot.render_placeholders()
+
+    @app.server.route(f'{PLACEHOLDER_ROUTE}/<path:filename>')
+    def serve_placeholder(filename):
+        return send_from_directory(musclemap_plot.PLACEHOLDER_DIR, filename, max_age=PLACEHOLDER_MAX_AGE)
+
+    def placeholder_src(message, colorblind_enabled):
+        filename = musclemap_plot.empty_muscle_map_file(message, colorblind_enabled)
+        return app.get_relative_path(f'{PLACEHOLDER_ROUTE}/{filename}')
+
     @app.callback(
         [Output('processed-strength-data-store', 'data'),
          Output('muscle-map-image', 'src')],
-        [Input('strength-data-store', 'data'),
+        [Input('stored-data', 'data'),
          Input('date-range', 'start_date'),
          Input('date-range', 'end_date'),
-         Input('stored-data', 'modified_timestamp'),
-         Input('global-colorblind-toggle', 'value')],
-        [State('stored-data', 'data')]
+         Input('global-colorblind-toggle', 'value')]
     )
-    def update_muscle_visualizations(raw_data, start_date, end_date, ts, colorblind_mode, stored_data):
+    def update_muscle_visualizations(stored_data, start_date, end_date, colorblind_mode):
         colorblind_enabled = bool(colorblind_mode and True in colorblind_mode)
 
-        if not raw_data:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            coordinates_path = os.path.join(script_dir, '..', 'charts', 'musclemap', 'data', 'muscle_coordinates.json')
-            muscle_coordinates = musclemap_plot.load_and_parse_muscle_coordinates(coordinates_path)
-            empty_img = musclemap_plot.create_empty_muscle_map(
-                muscle_coordinates,
-                zoom_out_factor=1.5,
-                message="Waiting for you to add your personal fitness data",
-                colorblind_mode=colorblind_enabled
-            )
-            empty_src = f"data:image/png;base64,{empty_img}"
-            return None, empty_src
-
-        try:
-            strength_activities = json.loads(raw_data)
-        except (json.JSONDecodeError, TypeError):
-            return None, None
+        dataset = load_dataset(stored_data)
+        if dataset is None:
+            return None, placeholder_src("Waiting for you to add your personal fitness data", colorblind_enabled)
 
-        filtered_activities = []
-        start = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
-        end = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+        processed_data = dataset.strength.between(start_date, end_date)
 
-        for activity in strength_activities:
-            activity_date_str = activity.get('startTimeLocal', activity.get('startTimeGMT'))
-            if not activity_date_str:
-                continue
+        if not processed_data:
+            return None, placeholder_src("No data available in this period of time", colorblind_enabled)
 
-            try:
-                activity_date = datetime.datetime.strptime(
-                    activity_date_str.split('.')[0], '%Y-%m-%d %H:%M:%S'
-                ).date()
+        # The strength data is unchanged when only the colour scheme flips
+        processed_json = no_update if only_triggered_by({'global-colorblind-toggle.value'}) else json.dumps(processed_data)
 
-                if start <= activity_date <= end:
-                    filtered_activities.append(activity)
-            except ValueError:
-                continue
-
-        if not filtered_activities:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            coordinates_path = os.path.join(script_dir, '..', 'charts', 'musclemap', 'data', 'muscle_coordinates.json')
-            muscle_coordinates = musclemap_plot.load_and_parse_muscle_coordinates(coordinates_path)
-            empty_img = musclemap_plot.create_empty_muscle_map(
-                muscle_coordinates,
-                zoom_out_factor=1.5,
-                message="No data available in this period of time",
-                colorblind_mode=colorblind_enabled
-            )
-            empty_src = f"data:image/png;base64,{empty_img}"
-            return None, empty_src
-
-        processed_data = musclemap_load.process_strength_activities(filtered_activities)
-
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        coordinates_path = os.path.join(script_dir, '..', 'charts', 'musclemap', 'data', 'muscle_coordinates.json')
-        muscle_coordinates = musclemap_plot.load_and_parse_muscle_coordinates(coordinates_path)
+        key = (stored_data.get('dataset_id'), stored_data.get('version'), start_date, end_date, colorblind_enabled)
+        with MUSCLE_MAP_CACHE_LOCK:
+            img_src = MUSCLE_MAP_CACHE.get(key)
+            if img_src is not None:
+                MUSCLE_MAP_CACHE.move_to_end(key)
+        if img_src is not None:
+            return processed_json, img_src
 
         img_data = musclemap_plot.plot_muscle_map(
             processed_data,
-            muscle_coordinates,
+            musclemap_plot.get_muscle_coordinates(),
             zoom_out_factor=1.5,
             colorblind_mode=colorblind_enabled
         )
 
         img_src = f"data:image/png;base64,{img_data}"
+        with MUSCLE_MAP_CACHE_LOCK:
+            MUSCLE_MAP_CACHE[key] = img_src
+            while len(MUSCLE_MAP_CACHE) > MAX_CACHED_MUSCLE_MAPS:
+                MUSCLE_MAP_CACHE.popitem(last=False)
 
-        return json.dumps(processed_data), img_src
+        return processed_json, img_src
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function toggleMuscleView(nClicks, currentView) {
+            if (nClicks === null || nClicks === undefined || currentView !== 'map') {
+                return [{'display': 'block'}, {'display': 'none'}, 'map'];
+            }
+            return [{'display': 'none'}, {'display': 'block'}, 'spider'];
+        }
+        """,
         [Output('muscle-map-container', 'style'),
          Output('spider-chart-container', 'style'),
          Output('muscle-view-type', 'data')],
         [Input('toggle-muscle-view', 'n_clicks')],
         [State('muscle-view-type', 'data')]
     )
-    def toggle_muscle_view(n_clicks, current_view):
-        if n_clicks is None:
-            return {'display': 'block'}, {'display': 'none'}, 'map'
-
-        if current_view == 'map':
-            return {'display': 'none'}, {'display': 'block'}, 'spider'
-        else:
-            return {'display': 'block'}, {'display': 'none'}, 'map'
\ No newline at end of file
@@ -1,5 +1,9 @@
-from dash import html, dcc
+from functools import lru_cache
+from dash import Patch, html, dcc
+import pandas as pd
 import plotly.graph_objects as go
+from modules.metrics import METRICS
+from modules.rollups import ACTIVITY_COUNT
 
 COLOR_SCHEMES = {
     'default': [
@@ -25,14 +29,14 @@ ACTIVITY_TYPE_LABELS = {
     'unknown': 'Other'
 }
 
-# Metric configurations
+# Metric configurations, 'count' counts activities, the rest come from the metric registry
 METRIC_CONFIGS = {
     'count': {'label': 'Activity Count', 'unit': 'activities', 'format': '.0f'},
-    'duration': {'label': 'Duration', 'unit': 'minutes', 'format': '.1f'},
-    'calories': {'label': 'Calories', 'unit': 'kcal', 'format': '.0f'},
-    'distance': {'label': 'Distance', 'unit': 'km', 'format': '.2f'},
-    'activityTrainingLoad': {'label': 'Training Load', 'unit': 'points', 'format': '.1f'},
-    'elevationGain': {'label': 'Elevation Gain', 'unit': 'm', 'format': '.1f'}
+    **{
+        metric: {'label': METRICS[metric]['short_label'], 'unit': METRICS[metric]['unit'],
+                 'format': METRICS[metric]['format']}
+        for metric in ['duration', 'calories', 'distance', 'activityTrainingLoad', 'elevationGain']
+    }
 }
 
 BREAKDOWN_METRICS = [
@@ -60,7 +64,9 @@ def create_activity_breakdown_layout():
         )
     ])
 
+@lru_cache(maxsize=None)
 def create_empty_donut_chart(message):
+    """Create an empty donut chart with a centered message"""
     fig = go.Figure(data=[go.Pie(
         labels=['No Data'],
         values=[1],
@@ -100,30 +106,25 @@ def create_empty_donut_chart(message):
 
     return fig
 
-def create_activity_breakdown_chart(df, selected_metric, colorblind_mode=False):
-    if df is None:
+def create_activity_breakdown_chart(totals, selected_metric, colorblind_mode=False):
+    """Create the donut chart from the rollup totals per activity type of the selected range"""
+    if totals is None:
         return create_empty_donut_chart("Waiting for you to add<br>your personal fitness data")
 
-    df = df.copy()
-    df['activity_type'] = df['activityType'].apply(lambda x: x['typeKey'] if isinstance(x, dict) else 'unknown')
-    df['activity_type_label'] = df['activity_type'].map(ACTIVITY_TYPE_LABELS)
-
     metric_config = METRIC_CONFIGS[selected_metric]
 
-    if len(df) == 0:
+    if len(totals) == 0:
         return create_empty_donut_chart("No data available<br>in this period of time")
 
+    labels = pd.Series(totals.index, index=totals.index).map(ACTIVITY_TYPE_LABELS)
+
     if selected_metric == 'count':
-        breakdown = df['activity_type_label'].value_counts()
-        total = len(df)
+        counts = totals[('sum', ACTIVITY_COUNT)].astype(int)
+        breakdown = counts.groupby(labels).sum().sort_values(ascending=False)
+        total = int(counts.sum())
         hover_template = "Activity: %{label}<br>Count: %{value}<br>Percentage: %{percent}"
     else:
-        if selected_metric == 'distance':
-            df[selected_metric] = df[selected_metric] / 1000
-        elif selected_metric == 'duration':
-            df[selected_metric] = df[selected_metric] / 60
-
-        breakdown = df.groupby('activity_type_label')[selected_metric].sum()
+        breakdown = totals[('sum', selected_metric)].groupby(labels).sum()
         total = breakdown.sum()
         hover_template = (f"Activity: %{{label}}<br>"
                           f"{metric_config['label']}: %{{value:{metric_config['format']}}} {metric_config['unit']}"
@@ -173,4 +174,10 @@ def create_activity_breakdown_chart(df, selected_metric, colorblind_mode=False):
         font=dict(family="Arial, sans-serif")
     )
 
+    return fig
+
+def patch_activity_breakdown_colors(colorblind_mode=False):
+    """Partial update of the donut chart for a new colour scheme"""
+    fig = Patch()
+    fig['data'][0]['marker']['colors'] = COLOR_SCHEMES['colorblind'] if colorblind_mode else COLOR_SCHEMES['default']
     return fig
\ No newline at end of file
@@ -1,6 +1,11 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
-from dash import dcc, html
+from dash import Patch, dcc, html
 import dash_bootstrap_components as dbc
+from modules.goal_matrix import classify_goals
+from modules.metrics import GOAL_METRICS, METRICS, default_goals, metric_unit
 
 COLOR_SCHEMES = {
     'default': {
@@ -19,133 +24,97 @@ COLOR_SCHEMES = {
     }
 }
 
+GOAL_STATUS_LABELS = np.array(['Goal Reached', 'Goal Almost Reached', 'Goal Not Reached'])
+
+# Bar buckets of the activity chart, auto picks the finest one that stays within MAX_BARS bars
+MAX_BARS = 150
+BUCKET_OPTIONS = [
+    {'label': 'Automatic', 'value': 'auto'},
+    {'label': 'Activity', 'value': 'activity'},
+    {'label': 'Day', 'value': 'day'},
+    {'label': 'Week', 'value': 'week'},
+    {'label': 'Month', 'value': 'month'},
+]
+BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 30.44}
+BUCKET_LABELS = {'activity': 'Activity', 'day': 'Day', 'week': 'Week', 'month': 'Month'}
+BUCKET_TICK_FORMATS = {'activity': '%b %d', 'day': '%b %d', 'week': '%b %d', 'month': '%b %Y'}
+
 def get_default_goals():
     """Return default goals for each metric"""
-    return {
-        'calories': 500,
-        'steps': 10000,
-        'duration': 60,  # minutes
-        'averageHR': 140,
-        'maxHR': 180,
-        'aerobicTrainingEffect': 3,
-        'anaerobicTrainingEffect': 1,
-        'distance': 5,  # km
-        'averageSpeed': 10,  # km/h
-        'maxSpeed': 15,  # km/h
-        'movingDuration': 900,  # minutes
-        'moderateIntensityMinutes': 30,
-        'vigorousIntensityMinutes': 20,
-        'elevationGain': 100,  # meters
-        'elevationLoss': 100,  # meters
-        'maxElevation': 500,  # meters
-        'totalSets': 15,
-        'totalReps': 150,
-        'activeSets': 15,
-        'waterEstimated': 500,  # ml
-        'minTemperature': 15,  # °C
-        'maxTemperature': 25,  # °C
-    }
+    return default_goals()
 
-def create_summary_chart(df, start_date, end_date, stored_goals, selected_metrics=None, colorblind_mode=False):
-    """Create a summary chart showing metrics' performance as percentage of their goals"""
-    summary_data = {}
+def summarize_goal_attainment(means, stored_goals, metrics):
+    """Goal percentages of the metric means, with one vectorized division and classification.
 
-    metrics_to_show = selected_metrics if selected_metrics else [opt['value'] for opt in METRIC_OPTIONS]
+    Returns the metrics that have a mean sorted by label, their means, goals,
+    percentages and reached / almost reached masks as arrays.
+    """
+    defaults = get_default_goals()
+    metrics = sorted((metric for metric in metrics if metric in means.index and metric in defaults),
+                     key=lambda metric: METRIC_LABEL_MAP.get(metric, metric))
 
-    for metric in metrics_to_show:
-        if metric in df.columns:
-            values = df[metric]
-            if metric == 'duration':
-                values = values / 60
-            elif metric == 'distance':
-                values = values / 1000
-
-            mean_value = values.mean()
-            goal_value = stored_goals.get(metric, get_default_goals()[metric])
-
-            percentage = (mean_value / goal_value * 100) if goal_value != 0 else 0
-
-            summary_data[metric] = {
-                'percentage': percentage,
-                'mean': mean_value,
-                'goal': goal_value,
-                'reached': percentage >= 100,
-                'almost_reached': 75 <= percentage < 100
-            }
+    mean_values = means.reindex(metrics).to_numpy(dtype='float64')
+    goal_values = np.array([stored_goals.get(metric, defaults[metric]) for metric in metrics], dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(goal_values != 0, mean_values / goal_values * 100, 0.0)
 
-    fig = go.Figure()
+    reached = percentages >= 100
+    almost_reached = (percentages >= 75) & ~reached
+    return metrics, mean_values, goal_values, percentages, reached, almost_reached
 
-    metrics = []
-    percentages_reached = []
-    percentages_almost_reached = []
-    percentages_not_reached = []
-    hover_texts = []
-
-    # Sort metrics by their labels
-    sorted_metrics = sorted(summary_data.keys(), key=lambda x: METRIC_LABEL_MAP.get(x, x))
-    valid_values = [p for p in (percentages_reached + percentages_almost_reached + percentages_not_reached) if p is not None]
-
-    for metric in sorted_metrics:
-        data = summary_data[metric]
-        metric_label = METRIC_LABEL_MAP.get(metric, metric.replace('_', ' ').title())
-        metrics.append(metric_label)
-
-        percentage = data['percentage']
-        if data['reached']:
-            percentages_reached.append(percentage)
-            percentages_almost_reached.append(None)
-            percentages_not_reached.append(None)
-        elif data['almost_reached']:
-            percentages_reached.append(None)
-            percentages_almost_reached.append(percentage)
-            percentages_not_reached.append(None)
-        else:
-            percentages_reached.append(None)
-            percentages_almost_reached.append(None)
-            percentages_not_reached.append(percentage)
-
-        units = get_metric_units(metric)
-        hover_texts.append(
-            f"Metric: {metric_label}<br>" +
-            f"Goal: {data['goal']:.1f} {units}<br>" +
-            f"Average: {data['mean']:.1f} {units}<br>" +
-            f"Percentage: {data['percentage']:.1f}%"
-        )
+def summary_bar_data(means, stored_goals, selected_metrics=None, status_counts=None):
+    """Metric labels, hover texts and the reached / almost / not reached percentage series of the summary chart.
 
+    status_counts are the per-activity goal counts from GoalMatrix.status_counts, shown on hover when given.
+    """
+    metrics_to_show = selected_metrics if selected_metrics else [opt['value'] for opt in METRIC_OPTIONS]
+    sorted_metrics, mean_values, goal_values, percentages, reached, almost_reached = summarize_goal_attainment(
+        means, stored_goals, metrics_to_show
+    )
+    not_reached = ~(reached | almost_reached)
+
+    metrics = [METRIC_LABEL_MAP.get(metric, metric.replace('_', ' ').title()) for metric in sorted_metrics]
+    hover_texts = [
+        f"Metric: {label}<br>" +
+        f"Goal: {goal:.1f} {get_metric_units(metric)}<br>" +
+        f"Average: {mean:.1f} {get_metric_units(metric)}<br>" +
+        f"Percentage: {percentage:.1f}%" +
+        format_status_counts((status_counts or {}).get(metric))
+        for metric, label, goal, mean, percentage in zip(sorted_metrics, metrics, goal_values, mean_values, percentages)
+    ]
+    series = [np.where(mask, percentages, np.nan) for mask in (reached, almost_reached, not_reached)]
+    return metrics, hover_texts, series
+
+def format_status_counts(counts):
+    if counts is None:
+        return ""
+    reached, almost, not_reached = counts
+    return f"<br>Activities: {reached} reached, {almost} almost, {not_reached} not reached"
+
+def summary_bar_texts(percentages):
+    return [f"{p:.1f}%" if not np.isnan(p) else "" for p in percentages]
+
+def create_summary_chart(means, stored_goals, selected_metrics=None, colorblind_mode=False, status_counts=None):
+    """Create a summary chart showing metrics' performance as percentage of their goals.
+
+    means are the metric means of the selected date range, see Rollups.means.
+    """
+    metrics, hover_texts, series = summary_bar_data(means, stored_goals, selected_metrics, status_counts)
     colors = COLOR_SCHEMES['colorblind'] if colorblind_mode else COLOR_SCHEMES['default']
 
-    fig.add_trace(go.Bar(
-        x=metrics,
-        y=percentages_reached,
-        marker_color=colors['reached'],
-        name='Goal Reached',
-        text=[f"{p:.1f}%" if p is not None else "" for p in percentages_reached],
-        textposition='auto',
-        hovertext=hover_texts,
-        hoverinfo='text'
-    ))
-
-    fig.add_trace(go.Bar(
-        x=metrics,
-        y=percentages_almost_reached,
-        marker_color=colors['almost'],
-        name='Goal Almost Reached',
-        text=[f"{p:.1f}%" if p is not None else "" for p in percentages_almost_reached],
-        textposition='auto',
-        hovertext=hover_texts,
-        hoverinfo='text'
-    ))
+    fig = go.Figure()
 
-    fig.add_trace(go.Bar(
-        x=metrics,
-        y=percentages_not_reached,
-        marker_color=colors['not_reached'],
-        name='Goal Not Reached',
-        text=[f"{p:.1f}%" if p is not None else "" for p in percentages_not_reached],
-        textposition='auto',
-        hovertext=hover_texts,
-        hoverinfo='text'
-    ))
+    for percentages, status, name in zip(series, ('reached', 'almost', 'not_reached'), GOAL_STATUS_LABELS):
+        fig.add_trace(go.Bar(
+            x=metrics,
+            y=percentages,
+            marker_color=colors[status],
+            name=name,
+            text=summary_bar_texts(percentages),
+            textposition='auto',
+            hovertext=hover_texts,
+            hoverinfo='text'
+        ))
 
     fig.add_shape(
         type="line",
@@ -203,32 +172,28 @@ def create_summary_chart(df, start_date, end_date, stored_goals, selected_metric
 
     return fig
 
-METRIC_OPTIONS = [
-    {'label': 'Active Sets', 'value': 'activeSets'},
-    {'label': 'Aerobic Training Effect', 'value': 'aerobicTrainingEffect'},
-    {'label': 'Anaerobic Training Effect', 'value': 'anaerobicTrainingEffect'},
-    {'label': 'Average Heart Rate', 'value': 'averageHR'},
-    {'label': 'Average Speed', 'value': 'averageSpeed'},
-    {'label': 'Calories', 'value': 'calories'},
-    {'label': 'Distance (km)', 'value': 'distance'},
-    {'label': 'Duration (minutes)', 'value': 'duration'},
-    {'label': 'Elevation Gain', 'value': 'elevationGain'},
-    {'label': 'Elevation Loss', 'value': 'elevationLoss'},
-    {'label': 'Max Elevation', 'value': 'maxElevation'},
-    {'label': 'Max Heart Rate', 'value': 'maxHR'},
-    {'label': 'Max Speed', 'value': 'maxSpeed'},
-    {'label': 'Max Temperature', 'value': 'maxTemperature'},
-    {'label': 'Min Temperature', 'value': 'minTemperature'},
-    {'label': 'Moderate Intensity Minutes', 'value': 'moderateIntensityMinutes'},
-    {'label': 'Moving Duration', 'value': 'movingDuration'},
-    {'label': 'Steps', 'value': 'steps'},
-    {'label': 'Total Reps', 'value': 'totalReps'},
-    {'label': 'Total Sets', 'value': 'totalSets'},
-    {'label': 'Vigorous Intensity Minutes', 'value': 'vigorousIntensityMinutes'},
-    {'label': 'Water Loss (ml)', 'value': 'waterEstimated'},
-]
+def patch_summary_chart(means, stored_goals, selected_metrics=None, colorblind_mode=False, status_counts=None):
+    """Partial update of a create_summary_chart figure for new goals or a new colour scheme.
+
+    The metrics on the x axis stay the same, so only the percentages, their
+    texts and the colours of the bars, goal lines and legend are rewritten.
+    """
+    metrics, hover_texts, series = summary_bar_data(means, stored_goals, selected_metrics, status_counts)
+    colors = COLOR_SCHEMES['colorblind'] if colorblind_mode else COLOR_SCHEMES['default']
+
+    fig = Patch()
+    for trace, (percentages, status) in enumerate(zip(series, ('reached', 'almost', 'not_reached'))):
+        fig['data'][trace]['y'] = percentages.tolist()
+        fig['data'][trace]['text'] = summary_bar_texts(percentages)
+        fig['data'][trace]['hovertext'] = hover_texts
+        fig['data'][trace]['marker']['color'] = colors[status]
+    fig['layout']['shapes'][0]['line']['color'] = colors['goal_line']
+    fig['layout']['shapes'][1]['line']['color'] = colors['almost_line']
+    fig['data'][3]['line']['color'] = colors['goal_line']
+    fig['data'][4]['line']['color'] = colors['almost_line']
+    return fig
 
-METRIC_OPTIONS = sorted(METRIC_OPTIONS, key=lambda x: x['label'])
+METRIC_OPTIONS = [{'label': METRICS[metric]['label'], 'value': metric} for metric in GOAL_METRICS]
 
 METRIC_LABEL_MAP = {opt['value']: opt['label'] for opt in METRIC_OPTIONS}
 
@@ -249,6 +214,7 @@ def create_metric_controls(first_day_last_month, last_day_last_month):
                 id={'type': 'goal-input', 'metric': 'quick-set'},
                 type="number",
                 placeholder="Enter goal value",
+                debounce=True,
                 style={
                     'width': '100px',
                     'padding': '5px',
@@ -260,6 +226,7 @@ def create_metric_controls(first_day_last_month, last_day_last_month):
         ])
     ])
 
+@lru_cache(maxsize=None)
 def create_empty_chart(message):
     """Create an empty chart with a centered message and greyed out background bars"""
     fig = go.Figure()
@@ -397,6 +364,13 @@ def create_data_loaded_div(first_day_last_month, last_day_last_month):
                     id='metric-selector',
                     options=METRIC_OPTIONS,
                     value='calories'
+                ),
+                html.Label("Group Bars By:", style={'marginTop': '10px'}),
+                dcc.Dropdown(
+                    id='bucket-selector',
+                    options=BUCKET_OPTIONS,
+                    value='auto',
+                    clearable=False
                 )
             ], id='metric-selector-container', style={'width': '50%', 'marginBottom': '20px'}),
 
@@ -407,6 +381,7 @@ def create_data_loaded_div(first_day_last_month, last_day_last_month):
                     id={'type': 'goal-input', 'metric': 'quick-set'},
                     type="number",
                     placeholder="Enter goal value",
+                    debounce=True,
                     style={
                         'width': '100px',
                         'padding': '5px',
@@ -467,78 +442,123 @@ def create_barchart_layout(first_day_last_month, last_day_last_month):
 
         # Only keep the stores that aren't in app.py
         dcc.Store(id='stored-goals', data=get_default_goals()),
+        dcc.Store(id='changed-goals', data={'goals': {}}),
         dcc.Store(id='view-type', data='detail')
     ])
 
-def create_activity_chart(df, selected_metric, start_date, end_date, goal_value, colorblind_mode=False):
+def resolve_bucket(bucket, activity_count, start_date, end_date, max_bars=MAX_BARS):
+    """Pick the bar bucket: an explicit choice wins, auto takes the finest bucket that fits max_bars"""
+    if bucket in BUCKET_DAYS or bucket == 'activity':
+        return bucket
+    if activity_count <= max_bars:
+        return 'activity'
+
+    span_days = (pd.Timestamp(str(end_date)[:10]) - pd.Timestamp(str(start_date)[:10])).days + 1
+    for candidate in ('day', 'week'):
+        if span_days / BUCKET_DAYS[candidate] <= max_bars:
+            return candidate
+    return 'month'
+
+def create_activity_chart(df, selected_metric, start_date, end_date, goal_value, colorblind_mode=False, values=None):
+    """Create the per-activity bar chart; df holds the activities from start_date to end_date in display units.
+
+    values are the metric values aligned with df, such as a GoalMatrix column; they are read from df if not given.
+    """
     if df is None:
         return create_empty_chart("Waiting for you to add<br>your personal fitness data")
 
-    # Handle unit conversions and data preprocessing
-    if selected_metric == 'duration':
-        df[selected_metric] = df[selected_metric] / 60  # Convert to minutes
-    elif selected_metric == 'distance':
-        df[selected_metric] = df[selected_metric] / 1000  # Convert to kilometers
-
-    mask = (df['startTimeLocal'] >= start_date) & (df['startTimeLocal'] <= end_date)
-    filtered_df = df.loc[mask]
+    if len(df) == 0:
+        return create_empty_chart("No data available<br>in this period of time")
 
-    if len(filtered_df) == 0:
+    if values is None:
+        values = activity_values(df, selected_metric)
+
+    activity_types = df['activity_type']
+    if isinstance(activity_types.dtype, pd.CategoricalDtype):
+        activity_types = np.asarray(activity_types.cat.categories.astype(str))[activity_types.cat.codes.to_numpy()]
+    else:
+        activity_types = activity_types.astype(str).to_numpy()
+
+    hovertemplate = ("Date: %{x}<br>" +
+                     f"{selected_metric}: %{{y}}<br>" +
+                     "Activity: %{customdata[0]}<br>" +
+                     "%{text}" +
+                     "<extra></extra>")
+    return create_goal_bar_figure(df['startTimeLocal'], values, [activity_types], hovertemplate, 'activity',
+                                  selected_metric, start_date, end_date, goal_value, colorblind_mode)
+
+def create_bucketed_activity_chart(buckets, bucket, selected_metric, start_date, end_date, goal_value,
+                                   colorblind_mode=False):
+    """Create the bar chart with one bar per day, week or month holding the average per activity.
+
+    buckets are the per-period totals from Rollups.buckets; goals are
+    classified against the bucket averages.
+    """
+    if buckets is None or len(buckets) == 0:
         return create_empty_chart("No data available<br>in this period of time")
 
-    if selected_metric not in filtered_df.columns:
-        filtered_df[selected_metric] = 0
+    values = bucket_values(buckets)
+
+    hovertemplate = (f"{BUCKET_LABELS[bucket]}: %{{x|{BUCKET_TICK_FORMATS[bucket]}}}<br>" +
+                     f"Average {selected_metric}: %{{y:.1f}}<br>" +
+                     "Activities: %{customdata[0]}<br>" +
+                     "%{text}" +
+                     "<extra></extra>")
+    return create_goal_bar_figure(buckets.index, values, [buckets['activities'].to_numpy(dtype=int)], hovertemplate,
+                                  bucket, selected_metric, start_date, end_date, goal_value, colorblind_mode)
+
+def activity_values(df, selected_metric):
+    """Bar values of the per-activity chart"""
+    if selected_metric in df.columns:
+        return df[selected_metric].to_numpy(dtype='float64')
+    return np.zeros(len(df))
 
-    goal_reached = filtered_df[filtered_df[selected_metric] >= goal_value]
-    goal_almost_reached = filtered_df[(filtered_df[selected_metric] >= 0.75 * goal_value) &
-                                      (filtered_df[selected_metric] < goal_value)]
-    goal_not_reached = filtered_df[filtered_df[selected_metric] < 0.75 * goal_value]
+def bucket_values(buckets):
+    """Bar values of the bucketed chart, the average per activity of each bucket"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (buckets['sum'] / buckets['count']).to_numpy(dtype='float64')
 
-    activity_types = filtered_df['activityType'].apply(lambda x: x['typeKey'] if isinstance(x, dict) else 'unknown')
+def classify_goal_status(values, goal_value):
+    """One classification pass: 0 reached, 1 almost reached, 2 not reached; missing values count as not reached"""
+    return classify_goals(values, goal_value) % 3
 
+def goal_status_colors(colorblind_mode=False):
     colors = COLOR_SCHEMES['colorblind'] if colorblind_mode else COLOR_SCHEMES['default']
+    return colors, np.array([colors['reached'], colors['almost'], colors['not_reached']])
 
-    fig = go.Figure()
+def create_goal_bar_figure(x, values, customdata, hovertemplate, bucket, selected_metric, start_date, end_date,
+                           goal_value, colorblind_mode=False):
+    """Draw classified goal bars as a single trace; the goal status is the bar text shown on hover.
 
-    # Add bars for "Goal Reached"
-    fig.add_trace(go.Bar(
-        x=goal_reached['startTimeLocal'],
-        y=goal_reached[selected_metric],
-        marker_color=colors['reached'],
-        name='Goal Reached',
-        text=activity_types[goal_reached.index],
-        hovertemplate="Date: %{x}<br>" +
-                      f"{selected_metric}: %{{y}}<br>" +
-                      "Activity: %{text}<br>" +
-                      "<extra></extra>"
-    ))
+    Trace order is bars, the three legend entries, then the goal and almost
+    reached lines, which patch_goal_bar_figure relies on.
+    """
+    status = classify_goal_status(values, goal_value)
+    colors, status_colors = goal_status_colors(colorblind_mode)
 
-    # Add bars for "Goal Almost Reached"
-    fig.add_trace(go.Bar(
-        x=goal_almost_reached['startTimeLocal'],
-        y=goal_almost_reached[selected_metric],
-        marker_color=colors['almost'],
-        name='Goal Almost Reached',
-        text=activity_types[goal_almost_reached.index],
-        hovertemplate="Date: %{x}<br>" +
-                      f"{selected_metric}: %{{y}}<br>" +
-                      "Activity: %{text}<br>" +
-                      "<extra></extra>"
-    ))
+    fig = go.Figure()
 
-    # Add bars for "Goal Not Reached"
     fig.add_trace(go.Bar(
-        x=goal_not_reached['startTimeLocal'],
-        y=goal_not_reached[selected_metric],
-        marker_color=colors['not_reached'],
-        name='Goal Not Reached',
-        text=activity_types[goal_not_reached.index],
-        hovertemplate="Date: %{x}<br>" +
-                      f"{selected_metric}: %{{y}}<br>" +
-                      "Activity: %{text}<br>" +
-                      "<extra></extra>"
+        x=x,
+        y=values,
+        marker_color=status_colors[status],
+        customdata=np.column_stack(customdata),
+        text=GOAL_STATUS_LABELS[status],
+        textposition='none',
+        showlegend=False,
+        hovertemplate=hovertemplate
     ))
 
+    # Legend entries for the bar colours
+    for name, color in zip(GOAL_STATUS_LABELS, status_colors):
+        fig.add_trace(go.Scatter(
+            x=[None],
+            y=[None],
+            mode='markers',
+            marker=dict(symbol='square', size=12, color=color),
+            name=name
+        ))
+
     # Update goal lines with appropriate colors
     fig.add_trace(go.Scatter(
         x=[start_date, end_date],
@@ -559,15 +579,14 @@ def create_activity_chart(df, selected_metric, start_date, end_date, goal_value,
     # Customize layout
     metric_label = METRIC_LABEL_MAP.get(selected_metric, selected_metric.replace('_', ' ').title())
     units = get_metric_units(selected_metric)
+    xaxis = dict(tickformat=BUCKET_TICK_FORMATS[bucket], ticklabelmode="period")
+    if bucket in ('activity', 'day') and len(values) <= MAX_BARS:
+        xaxis['dtick'] = "D1"
 
     fig.update_layout(
-        title=f"{metric_label} Over Time",
+        title=f"{metric_label} Over Time" if bucket == 'activity' else f"{metric_label} per {BUCKET_LABELS[bucket]}",
         yaxis_title=f"{metric_label} ({units})",
-        xaxis=dict(
-            tickformat="%b %d",
-            ticklabelmode="period",
-            dtick="D1"
-        ),
+        xaxis=xaxis,
         barmode='group',
         hovermode='closest',
         legend=dict(
@@ -580,30 +599,26 @@ def create_activity_chart(df, selected_metric, start_date, end_date, goal_value,
 
     return fig
 
+def patch_goal_bar_figure(values, goal_value, colorblind_mode=False):
+    """Partial update of a create_goal_bar_figure figure for a new goal or colour scheme.
+
+    Only the bar colours and statuses, the legend colours and the goal lines
+    are rewritten; the bars themselves stay in the browser.
+    """
+    status = classify_goal_status(values, goal_value)
+    colors, status_colors = goal_status_colors(colorblind_mode)
+
+    fig = Patch()
+    fig['data'][0]['marker']['color'] = status_colors[status].tolist()
+    fig['data'][0]['text'] = GOAL_STATUS_LABELS[status].tolist()
+    for trace, color in enumerate(status_colors, start=1):
+        fig['data'][trace]['marker']['color'] = color
+    fig['data'][4]['y'] = [goal_value, goal_value]
+    fig['data'][4]['line']['color'] = colors['goal_line']
+    fig['data'][5]['y'] = [0.75 * goal_value, 0.75 * goal_value]
+    fig['data'][5]['line']['color'] = colors['almost_line']
+    return fig
+
 def get_metric_units(metric):
-    """Return the appropriate units for each metric"""
-    units = {
-        'calories': 'kcal',
-        'steps': 'steps',
-        'duration': 'minutes',
-        'averageHR': 'bpm',
-        'maxHR': 'bpm',
-        'aerobicTrainingEffect': 'points',
-        'anaerobicTrainingEffect': 'points',
-        'distance': 'km',
-        'averageSpeed': 'km/h',
-        'maxSpeed': 'km/h',
-        'movingDuration': 'minutes',
-        'moderateIntensityMinutes': 'minutes',
-        'vigorousIntensityMinutes': 'minutes',
-        'elevationGain': 'm',
-        'elevationLoss': 'm',
-        'maxElevation': 'm',
-        'totalSets': 'sets',
-        'totalReps': 'reps',
-        'activeSets': 'sets',
-        'waterEstimated': 'ml',
-        'minTemperature': '°C',
-        'maxTemperature': '°C'
-    }
-    return units.get(metric, '')
\ No newline at end of file
+    """Return the display units of a metric"""
+    return metric_unit(metric)
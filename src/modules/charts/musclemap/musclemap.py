@@ -1,3 +1,4 @@
+from functools import lru_cache
 from dash import html, dcc
 import plotly.graph_objects as go
 import json
@@ -111,6 +112,7 @@ def create_spider_chart(processed_data, start_date, end_date):
 
     return fig
 
+@lru_cache(maxsize=None)
 def create_empty_spider_chart(message="Waiting for you to add<br>your personal fitness data"):
     """Create an empty spider chart with default muscle groups and message"""
     empty_muscles = {
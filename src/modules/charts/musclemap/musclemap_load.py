@@ -1,6 +1,7 @@
 import json
 import os
 import datetime
+from modules.time_index import TimeIndex
 
 known_exercises = [
     "BENCH_PRESS",
@@ -79,60 +80,98 @@ def save_exercise_mappings():
     with open("src/modules/charts/musclemap/data/exercise_to_musclegroup.json", "w") as f:
         json.dump(exercise_to_musclegroup, f, indent=4)
 
-def process_strength_activities(strength_activities):
-    load_exercise_mappings()
+def process_strength_activity(activity):
+    """Turn one raw strength activity into its date and per-exercise muscle groups"""
+    activity_date_str = activity.get("startTimeLocal", activity.get("startTimeGMT"))
+    if not activity_date_str:
+        return None
 
-    processed_data = []
-    for activity in strength_activities:
-        activity_date_str = activity.get("startTimeLocal", activity.get("startTimeGMT"))
-        if not activity_date_str:
-            continue
-
-        # Parse date
+    # Parse date, typed frames already carry a datetime
+    if isinstance(activity_date_str, datetime.datetime):
+        activity_date = activity_date_str.date()
+    else:
         try:
             try:
                 activity_date = datetime.datetime.strptime(activity_date_str, "%Y-%m-%d %H:%M:%S").date()
             except ValueError:
                 activity_date = datetime.datetime.strptime(activity_date_str, "%Y-%m-%d %H:%M:%S.%f").date()
         except ValueError:
-            continue
+            return None
+
+    exercise_sets = activity.get("summarizedExerciseSets", [])
+    if not exercise_sets:
+        return None
+
+    activity_exercises = []
+
+    for exercise_set in exercise_sets:
+        exercise_name = exercise_set.get("category", "UNKNOWN")
+        repetitions = exercise_set.get("reps", 0)
+        sets = exercise_set.get("sets", 1)
+
+        if exercise_name not in exercise_to_musclegroup:
+            # Unknown exercise defaults to Undefined muscles
+            muscle_groups_info = {"primary": ["Undefined"], "secondary": ["Undefined"]}
+            exercise_to_musclegroup[exercise_name] = muscle_groups_info
+        else:
+            muscle_groups_info = exercise_to_musclegroup[exercise_name]
+
+        exercise_info = {
+            "exercise_name": exercise_name,
+            "repetitions": repetitions,
+            "sets": sets,
+            "primary_muscles": muscle_groups_info["primary"],
+            "secondary_muscles": muscle_groups_info["secondary"],
+        }
+
+        activity_exercises.append(exercise_info)
+
+    return {
+        "date": activity_date.isoformat(),
+        "exercises": activity_exercises,
+    }
 
-        exercise_sets = activity.get("summarizedExerciseSets", [])
-        if not exercise_sets:
-            continue
+def process_strength_activities(strength_activities):
+    load_exercise_mappings()
 
-        activity_exercises = []
+    processed_data = []
+    for activity in strength_activities:
+        processed = process_strength_activity(activity)
+        if processed is not None:
+            processed_data.append(processed)
 
-        for exercise_set in exercise_sets:
-            exercise_name = exercise_set.get("category", "UNKNOWN")
-            repetitions = exercise_set.get("reps", 0)
-            sets = exercise_set.get("sets", 1)
+    with open("src/modules/charts/musclemap/data/processed_strength_activities.json", "w") as f:
+        json.dump(processed_data, f, indent=4)
 
-            if exercise_name not in exercise_to_musclegroup:
-                # Unknown exercise defaults to Undefined muscles
-                muscle_groups_info = {"primary": ["Undefined"], "secondary": ["Undefined"]}
-                exercise_to_musclegroup[exercise_name] = muscle_groups_info
-            else:
-                muscle_groups_info = exercise_to_musclegroup[exercise_name]
+    save_exercise_mappings()
 
-            exercise_info = {
-                "exercise_name": exercise_name,
-                "repetitions": repetitions,
-                "sets": sets,
-                "primary_muscles": muscle_groups_info["primary"],
-                "secondary_muscles": muscle_groups_info["secondary"],
-            }
+    return processed_data
 
-            activity_exercises.append(exercise_info)
+class StrengthIndex:
+    """Pre-parsed strength activities sorted by date, queried by date range"""
 
-        processed_data.append({
-            "date": activity_date.isoformat(),
-            "exercises": activity_exercises,
-        })
+    def __init__(self, processed_activities):
+        self.activities = sorted(processed_activities, key=lambda activity: activity["date"])
+        self.time_index = TimeIndex([activity["date"] for activity in self.activities])
 
-    with open("src/modules/charts/musclemap/data/processed_strength_activities.json", "w") as f:
-        json.dump(processed_data, f, indent=4)
+    def __len__(self):
+        return len(self.activities)
 
-    save_exercise_mappings()
+    def between(self, start_date, end_date):
+        """Return the processed activities from start_date to end_date, both inclusive"""
+        return self.activities[self.time_index.positions(start_date, end_date)]
 
-    return processed_data
+def build_strength_index(activities):
+    """Parse every strength activity once, at ingest time"""
+    load_exercise_mappings()
+
+    processed_activities = []
+    for activity in activities:
+        exercise_sets = activity.get("summarizedExerciseSets")
+        if not isinstance(exercise_sets, list) or not exercise_sets:
+            continue
+        processed = process_strength_activity(activity)
+        if processed is not None:
+            processed_activities.append(processed)
+
+    return StrengthIndex(processed_activities)
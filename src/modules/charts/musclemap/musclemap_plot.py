@@ -8,8 +8,11 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Polygon
 import io
 import base64
+import hashlib
+from functools import lru_cache
 import numpy as np
 import matplotlib.colors as mcolors
+from modules.atomic_file import write_atomic
 
 COLOR_SCHEMES = {
     'default': {
@@ -29,6 +32,17 @@ MAIN_AXES_POSITION = [0.1, 0.1, 0.8, 0.8]
 SPIDER_CHART_POSITION = [0.71, 0.2, 0.4, 0.4]
 LEGEND_POSITION = [0.85, 0.75, 0.2, 0.05]
 
+COORDINATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'muscle_coordinates.json')
+
+# Empty muscle maps are rendered once per message and colour scheme and served as static files.
+# Bump PLACEHOLDER_VERSION when the drawing changes so browsers and the disk cache pick up new files.
+PLACEHOLDER_DIR = os.path.abspath(os.path.join('data', 'cache', 'placeholders'))
+PLACEHOLDER_VERSION = 1
+PLACEHOLDER_MESSAGES = (
+    "Waiting for you to add your personal fitness data",
+    "No data available in this period of time",
+)
+
 def get_color_with_intensity(color_spec, intensity):
     """Convert color specification and intensity to RGBA."""
     base_color = color_spec['base']
@@ -302,6 +316,32 @@ def create_spider_chart(ax, muscle_activity, position=SPIDER_CHART_POSITION, col
 
     return ax_spider
 
+@lru_cache(maxsize=None)
+def get_muscle_coordinates(filename=COORDINATES_PATH):
+    """Parsed muscle coordinates, read once per process; the result is shared and must not be modified"""
+    return load_and_parse_muscle_coordinates(filename)
+
+@lru_cache(maxsize=None)
+def empty_muscle_map_file(message, colorblind_mode=False, zoom_out_factor=1.5, directory=PLACEHOLDER_DIR):
+    """File name of the empty muscle map PNG in directory, rendered only if it is not there yet"""
+    key = repr((PLACEHOLDER_VERSION, message, bool(colorblind_mode), zoom_out_factor, FIGURE_SIZE))
+    filename = f"musclemap-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.png"
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        return filename
+
+    img_data = create_empty_muscle_map(get_muscle_coordinates(), zoom_out_factor=zoom_out_factor,
+                                       message=message, colorblind_mode=colorblind_mode)
+    os.makedirs(directory, exist_ok=True)
+    write_atomic(path, base64.b64decode(img_data))
+    return filename
+
+def render_placeholders(directory=PLACEHOLDER_DIR):
+    """Render every empty muscle map that is not on disk yet, in both colour schemes"""
+    for message in PLACEHOLDER_MESSAGES:
+        for colorblind_mode in (False, True):
+            empty_muscle_map_file(message, colorblind_mode, directory=directory)
+
 def load_and_parse_muscle_coordinates(filename):
     file_path = os.path.abspath(filename)
 
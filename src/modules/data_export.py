@@ -0,0 +1,137 @@
+import io
+import gzip
+import json
+import numpy as np
+import pandas as pd
+from modules.metrics import to_source_units
+
+EXPORT_FORMATS = {
+    'json': {'label': 'JSON (.json)', 'extension': 'json'},
+    'jsonl.gz': {'label': 'Compressed JSON Lines (.jsonl.gz)', 'extension': 'jsonl.gz'},
+    'npz': {'label': 'Compact columnar (.npz)', 'extension': 'npz'},
+}
+
+EXPORT_CHUNK_SIZE = 500  # records serialized per write
+NPZ_JSON_COLUMNS_KEY = '__json_columns__'
+
+
+def _activity_type_key(record):
+    activity_type = record.get('activityType')
+    if isinstance(activity_type, dict):
+        return activity_type.get('typeKey')
+    # Records read back from npz exports carry the flattened column
+    return record.get('activity_type')
+
+
+def _has_exercise_sets(value):
+    return isinstance(value, list) and len(value) > 0
+
+
+def filter_records(records, start_date=None, end_date=None, activity_types=None, strength_only=False):
+    """Lazily filter raw activity records by date range, activity type and strength sets"""
+    activity_types = set(activity_types) if activity_types else None
+
+    for record in records:
+        day = (record.get('startTimeLocal') or '')[:10]
+        if start_date and day < start_date:
+            continue
+        if end_date and day > end_date:
+            continue
+        if activity_types is not None and _activity_type_key(record) not in activity_types:
+            continue
+        if strength_only and not _has_exercise_sets(record.get('summarizedExerciseSets')):
+            continue
+        yield record
+
+
+def filter_activity_frame(df, start_date=None, end_date=None, activity_types=None, strength_only=False):
+    """Apply the same filters as filter_records to a projected activity frame"""
+    mask = np.ones(len(df), dtype=bool)
+
+    if start_date or end_date:
+        days = df['startTimeLocal'].astype(str).str[:10]
+        if start_date:
+            mask &= (days >= start_date).to_numpy()
+        if end_date:
+            mask &= (days <= end_date).to_numpy()
+    if activity_types:
+        mask &= df['activity_type'].isin(activity_types).to_numpy()
+    if strength_only:
+        mask &= df['summarizedExerciseSets'].map(_has_exercise_sets).to_numpy(dtype=bool)
+
+    return df[mask]
+
+
+def _iter_chunks(records, chunk_size=EXPORT_CHUNK_SIZE):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_json(records, buffer):
+    """Write records as an indented JSON array, chunk by chunk"""
+    buffer.write(b'[')
+    first = True
+    for chunk in _iter_chunks(records):
+        parts = []
+        for record in chunk:
+            parts.append('\n  ' if first else ',\n  ')
+            parts.append(json.dumps(record, indent=2).replace('\n', '\n  '))
+            first = False
+        buffer.write(''.join(parts).encode('utf-8'))
+    buffer.write(b']' if first else b'\n]')
+
+
+def write_jsonl_gz(records, buffer):
+    """Write records as gzip-compressed JSON Lines, chunk by chunk"""
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+        for chunk in _iter_chunks(records):
+            archive.write(''.join(json.dumps(record) + '\n' for record in chunk).encode('utf-8'))
+
+
+def write_npz(df, buffer):
+    """Write a projected activity frame as a compressed NumPy archive with one array per column.
+
+    Metrics are written in Garmin's raw units, like the JSON exports.
+    Columns that are not numeric (timestamps, activity types, exercise sets)
+    are stored as JSON strings so the file can be read without pickle.
+    """
+    df = to_source_units(df)
+    arrays = {}
+    json_columns = []
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            arrays[column] = values.to_numpy()
+        else:
+            arrays[column] = np.array([json.dumps(value, default=str) for value in values.astype(object)], dtype=str)
+            json_columns.append(column)
+    arrays[NPZ_JSON_COLUMNS_KEY] = np.array(json_columns, dtype=str)
+    np.savez_compressed(buffer, **arrays)
+
+
+def read_npz_records(content):
+    """Yield activity records from bytes written by write_npz"""
+    with np.load(io.BytesIO(content), allow_pickle=False) as archive:
+        json_columns = set(archive[NPZ_JSON_COLUMNS_KEY].tolist()) if NPZ_JSON_COLUMNS_KEY in archive else set()
+        columns = {}
+        for name in archive.files:
+            if name == NPZ_JSON_COLUMNS_KEY:
+                continue
+            values = archive[name].tolist()
+            columns[name] = [json.loads(value) for value in values] if name in json_columns else values
+
+    if not columns:
+        return
+    row_count = len(next(iter(columns.values())))
+    for row in range(row_count):
+        record = {name: values[row] for name, values in columns.items()}
+        if not record.get('activityType') and record.get('activity_type'):
+            # Archived like a Garmin record, so the JSON exports can filter it by type
+            record['activityType'] = {'typeKey': record['activity_type']}
+        yield record
@@ -1,19 +1,37 @@
 import pandas as pd
-import json
+import numpy as np
 import io
+import gzip
+import json
+import zlib
+import codecs
 import base64
-from garminconnect import Garmin
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from modules.metrics import METRICS, METRIC_COLUMNS, to_display_units
+from modules.dataset_store import DATASET_STORE, write_raw_record
+from modules.garmin_sync import MAX_CONCURRENT_PAGES, PUBLISH_GROWTH, iter_activity_pages, iter_new_activity_pages
+from modules.garmin_session import run_with_garmin_session
+from modules.data_export import read_npz_records
+
+STREAM_CHUNK_SIZE = 1 << 20  # base64 characters decoded per step
+MAX_PARSE_WORKERS = 4  # processes, JSON decoding holds the GIL
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+START_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# The only fields any chart reads; everything else stays in the raw archive
+DASHBOARD_COLUMNS = ['activityId', 'activityType', 'startTimeLocal', 'startTimeGMT', 'summarizedExerciseSets'] + METRIC_COLUMNS
 
 def process_activity_data(data, source="file"):
     """Common processing function for both API and file data"""
     try:
-        if isinstance(data, list):
+        if isinstance(data, (list, dict)):
             df = pd.DataFrame(data)
         else:
             df = data
 
-        if 'startTimeLocal' in df.columns:
-            df['startTimeLocal'] = pd.to_datetime(df['startTimeLocal'], errors='coerce')
+        df = to_display_units(apply_activity_dtypes(df))
 
         if 'summarizedExerciseSets' in df.columns:
             return df, f"Strength data processed successfully from {source}."
@@ -28,11 +46,179 @@ def process_activity_data(data, source="file"):
     except Exception as e:
         return None, f"Error processing data: {e}"
 
+def apply_activity_dtypes(df):
+    """Give a projected activity frame the compact dtypes every chart relies on.
+
+    startTimeLocal is parsed once with a fixed format into datetime64, metrics
+    become float32 and the Garmin activityType dict is replaced by a
+    categorical activity_type column. Already typed columns are left alone,
+    so the function is cheap to re-apply after a merge.
+    """
+    if 'startTimeLocal' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['startTimeLocal']):
+        df['startTimeLocal'] = pd.to_datetime(
+            df['startTimeLocal'].astype('string').str.slice(0, 19),
+            format=START_TIME_FORMAT,
+            errors='coerce'
+        )
+
+    for metric in METRIC_COLUMNS:
+        dtype = METRICS[metric]['dtype']
+        if metric in df.columns and df[metric].dtype != dtype:
+            df[metric] = pd.to_numeric(df[metric], errors='coerce').astype(dtype)
+
+    if 'activityType' in df.columns:
+        df['activity_type'] = df['activityType'].map(
+            lambda x: (x.get('typeKey') or 'unknown') if isinstance(x, dict) else 'unknown'
+        )
+        df = df.drop(columns='activityType')
+    if 'activity_type' in df.columns and not isinstance(df['activity_type'].dtype, pd.CategoricalDtype):
+        df['activity_type'] = df['activity_type'].fillna('unknown').astype('category')
+
+    return df
+
+def build_activity_frame(columns):
+    """Turn projected raw column buffers into a typed frame in display units, indexed by activityId"""
+    df = pd.DataFrame(columns)
+    if 'activityId' in df.columns:
+        # Records without an id cannot be duplicates of each other, keep all of them
+        df = df[df['activityId'].isna() | ~df['activityId'].duplicated(keep='last')]
+        df.index = pd.Index(df['activityId'].to_numpy())
+    return to_display_units(apply_activity_dtypes(df))
+
+def merge_activity_frames(existing_df, new_df):
+    """Merge new activities into an existing frame, the new version of an activityId wins.
+
+    Overlapping activities are found by looking the new ids up in the
+    existing activityId index, so only the new rows are hashed. Dtypes are
+    converted on the new rows before the concat; the existing rows are only
+    copied.
+    """
+    if new_df is None or new_df.empty:
+        return existing_df
+    if existing_df is None or existing_df.empty:
+        return new_df
+
+    # Activities without an id never replace each other, and the index may hold several of them
+    new_ids = new_df.index[new_df.index.notna()]
+    positions = existing_df.index.get_indexer_for(new_ids)
+    replaced = positions[positions >= 0]
+    if len(replaced):
+        keep = np.ones(len(existing_df), dtype=bool)
+        keep[replaced] = False
+        existing_df = existing_df[keep]
+
+    new_df = apply_activity_dtypes(new_df.reindex(columns=new_df.columns.union(existing_df.columns, sort=False)))
+    existing_df, new_df = align_activity_types(existing_df, new_df)
+    return pd.concat([new_df, existing_df])
+
+def align_activity_types(existing_df, new_df):
+    """Give both activity_type columns the same categories, otherwise concat falls back to object.
+
+    New categories are appended, so the codes of the existing rows stay valid.
+    """
+    types = [df['activity_type'] for df in (existing_df, new_df) if 'activity_type' in df.columns]
+    if len(types) < 2 or not all(isinstance(column.dtype, pd.CategoricalDtype) for column in types):
+        return existing_df, new_df
+
+    categories = existing_df['activity_type'].cat.categories
+    added = new_df['activity_type'].cat.categories.difference(categories)
+    if len(added):
+        existing_df = existing_df.assign(activity_type=existing_df['activity_type'].cat.add_categories(added))
+        categories = existing_df['activity_type'].cat.categories
+    return existing_df, new_df.assign(activity_type=new_df['activity_type'].cat.set_categories(categories))
+
+def combine_activity_frames(frames):
+    """Concatenate activity frames given newest first, keeping the first copy of each activityId"""
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return None
+    combined = pd.concat(frames)
+    combined = combined[combined.index.isna() | ~combined.index.duplicated(keep='first')]
+    return apply_activity_dtypes(combined)
+
+def sync_garmin_dataset(api, dataset_id, existing_df=None, sync_marker=None, on_progress=None, store=DATASET_STORE,
+                        max_workers=MAX_CONCURRENT_PAGES, checkpoint=None, bucket=None, page_timings=None):
+    """Fetch Garmin activities into the dataset store, publishing partial versions while pages arrive.
+
+    With an existing frame and a sync marker only newer activities are
+    fetched and merged in, otherwise the whole history is downloaded. Partial
+    versions of a full download are merged over the existing frame, so an
+    interrupted re-sync never leaves the dataset with fewer activities.
+    Pages completed by an interrupted earlier run are replayed from the
+    checkpoint and fetching continues after them; the checkpoint is cleared
+    once the sync has finished. Requests are paced by the token bucket, if
+    one is given, and their timings appended to page_timings.
+    on_progress is called with (fetched_count, ref) after every page.
+
+    Pages are appended to one running frame only when a partial version is
+    published, after 1, 2, 4, 8, ... pages, so the merges and dataset
+    rebuilds grow with the history instead of its square.
+    Returns (ref, activities_df, fetched_count); ref is None when there was
+    nothing new.
+    """
+    page_timings = page_timings if page_timings is not None else []
+
+    resumed_pages = []
+    if checkpoint is not None and checkpoint.load():
+        resumed_pages = checkpoint.iter_pages()
+        page_timings.extend(checkpoint.timings)
+        print(f"Resuming Garmin sync after {len(checkpoint.pages)} checkpointed pages")
+    start = checkpoint.next_start if checkpoint is not None else 0
+
+    incremental = existing_df is not None and bool(sync_marker)
+    if incremental:
+        fetched_pages = iter_new_activity_pages(api, sync_marker, start=start, bucket=bucket,
+                                                on_timing=page_timings.append)
+        base_df = existing_df
+    else:
+        fetched_pages = iter_activity_pages(api, max_workers=max_workers, start=start, bucket=bucket,
+                                            on_timing=page_timings.append)
+        base_df = None
+    pages = itertools.chain(((page, False) for page in resumed_pages), ((page, True) for page in fetched_pages))
+
+    ref = None
+    fetched_df = None  # pages up to the last publication, newest first
+    pending_frames = []
+    page_count = 0
+    next_publish = 1
+    fetched_count = 0
+
+    with store.archive_writer(dataset_id, append=incremental) as archive:
+        for page, is_new in pages:
+            pending_frames.append(build_activity_frame(ingest_activities(page, archive)))
+            page_count += 1
+            fetched_count += len(page)
+            if is_new and checkpoint is not None:
+                checkpoint.add_page(page, page_timings)
+
+            # The first page is published right away so the newest activities show up first
+            if page_count == next_publish:
+                fetched_df = combine_activity_frames([fetched_df] + pending_frames)
+                pending_frames = []
+                next_publish *= PUBLISH_GROWTH
+                ref = store.put(dataset_id, merge_activity_frames(existing_df, fetched_df))
+            if on_progress is not None:
+                on_progress(fetched_count, ref)
+
+    if checkpoint is not None:
+        checkpoint.clear()
+    if not page_count:
+        return None, existing_df, 0
+
+    # A full download replaces the existing frame, which the partial versions still held, once it is complete
+    if pending_frames:
+        fetched_df = combine_activity_frames([fetched_df] + pending_frames)
+    activities_df = merge_activity_frames(base_df, fetched_df)
+    if pending_frames or (not incremental and existing_df is not None):
+        ref = store.put(dataset_id, activities_df)
+        if on_progress is not None:
+            on_progress(fetched_count, ref)
+
+    return ref, activities_df, fetched_count
+
 def fetch_garmin_data(username, password):
     try:
-        client = Garmin(username, password)
-        client.login()
-        activities = client.get_activities(0, 30)
+        activities = run_with_garmin_session(username, password, lambda client: client.get_activities(0, 30))
         return process_activity_data(activities, "Garmin API")
     except Exception as e:
         print(f"Error fetching Garmin data: {e}")
@@ -40,14 +226,234 @@ def fetch_garmin_data(username, password):
 
 def process_uploaded_file(contents, filename):
     content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
 
     try:
         if 'json' in filename.lower():
-            data = json.load(io.BytesIO(decoded))
-            return process_activity_data(data, filename)
+            columns = ingest_activity_stream(iter_base64_chunks(content_string))
+            return process_activity_data(columns, filename)
         else:
             return None, "Unsupported file format. Please upload a JSON file."
 
     except Exception as e:
-        return None, f"Error processing file: {e}"
\ No newline at end of file
+        return None, f"Error processing file: {e}"
+
+def detect_upload_format(filename):
+    """Map an uploaded file name onto one of the readable export formats"""
+    name = (filename or '').lower()
+    if name.endswith('.npz'):
+        return 'npz'
+    if name.endswith(('.jsonl.gz', '.ndjson.gz')):
+        return 'jsonl.gz'
+    if name.endswith('.json.gz'):
+        return 'json.gz'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if 'json' in name:
+        return 'json'
+    return None
+
+def parse_uploaded_export(contents, filename):
+    """Parse one uploaded export into an activity frame and a gzip member holding its raw records"""
+    content_type, content_string = contents.split(',')
+    upload_format = detect_upload_format(filename)
+
+    raw_buffer = io.BytesIO()
+    with gzip.open(raw_buffer, 'wt', encoding='utf-8') as archive:
+        if upload_format == 'npz':
+            columns = ingest_activities(read_npz_records(base64.b64decode(content_string)), archive)
+        else:
+            byte_chunks = iter_base64_chunks(content_string)
+            if upload_format.endswith('.gz'):
+                byte_chunks = iter_gunzip(byte_chunks)
+            if upload_format.startswith('jsonl'):
+                columns = ingest_activities(iter_json_lines(byte_chunks), archive)
+            else:
+                columns = ingest_activity_stream(byte_chunks, archive)
+
+    return build_activity_frame(columns), raw_buffer.getvalue()
+
+def parse_uploaded_exports(contents_list, filenames, max_workers=MAX_PARSE_WORKERS):
+    """Parse several uploaded exports in parallel worker processes.
+
+    Decoding is pure Python, so threads would only take turns on the GIL.
+    Each worker sends back its frame and raw archive member pickled; a
+    single file is parsed in place. Returns the merged activity frame
+    (later files win on duplicate activityIds), the raw archive members in
+    upload order and the names of the files that were skipped.
+    """
+    accepted = [(contents, filename) for contents, filename in zip(contents_list, filenames)
+                if detect_upload_format(filename)]
+    skipped = [filename for filename in filenames if not detect_upload_format(filename)]
+    if not accepted:
+        return None, [], skipped
+
+    workers = max(1, min(max_workers, len(accepted)))
+    if workers == 1:
+        parsed = [parse_uploaded_export(contents, filename) for contents, filename in accepted]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(parse_uploaded_export, *zip(*accepted)))
+
+    merged_df = None
+    for frame, _ in parsed:
+        merged_df = merge_activity_frames(merged_df, frame)
+
+    return merged_df, [raw for _, raw in parsed], skipped
+
+class ColumnBuffers:
+    """Column-oriented accumulator that keeps every column aligned to the same row count"""
+
+    def __init__(self):
+        self.columns = {}
+        self.row_count = 0
+
+    def append(self, record):
+        for key, value in record.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [None] * self.row_count
+            column.append(value)
+
+        self.row_count += 1
+        for column in self.columns.values():
+            if len(column) < self.row_count:
+                column.append(None)
+
+
+def iter_base64_chunks(content_string, chunk_size=STREAM_CHUNK_SIZE):
+    """Decode a base64 string slice by slice instead of all at once"""
+    chunk_size -= chunk_size % 4
+    for offset in range(0, len(content_string), chunk_size):
+        yield base64.b64decode(content_string[offset:offset + chunk_size])
+
+
+def iter_gunzip(byte_chunks):
+    """Decompress a stream of gzip bytes chunk by chunk, including multi-member files"""
+    decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+    for chunk in byte_chunks:
+        while chunk:
+            yield decompressor.decompress(chunk)
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+            else:
+                chunk = b''
+    yield decompressor.flush()
+
+
+def iter_json_lines(byte_chunks):
+    """Yield one parsed value per non-empty line of a JSON Lines stream"""
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    for chunk in byte_chunks:
+        pending += text_decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    pending += text_decoder.decode(b'', final=True)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def iter_json_array(byte_chunks):
+    """Yield the elements of a top-level JSON array one at a time.
+
+    A top-level object is yielded as a single element, mirroring how uploads
+    were handled before.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(byte_chunks)
+    buffer = ''
+    pos = 0
+    exhausted = False
+    in_array = None
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer = buffer[pos:] + text_decoder.decode(b'', final=True)
+            exhausted = True
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+            pos += 1
+
+        if pos >= len(buffer):
+            if exhausted:
+                if in_array:
+                    raise ValueError("Unexpected end of file inside the activity list")
+                return
+            read_more()
+            continue
+
+        if in_array is None:
+            if buffer[pos] == '\ufeff':
+                pos += 1
+                continue
+            in_array = buffer[pos] == '['
+            if in_array:
+                pos += 1
+                continue
+        elif in_array and buffer[pos] == ']':
+            return
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise
+            read_more()
+            continue
+
+        # A value that ends exactly at the buffer edge may still be incomplete
+        if end >= len(buffer) and not exhausted:
+            read_more()
+            continue
+
+        pos = end
+        yield element
+
+        if not in_array:
+            return
+
+
+def project_activity(activity):
+    """Reduce a raw Garmin activity to the dashboard columns"""
+    projected = {column: activity.get(column) for column in DASHBOARD_COLUMNS}
+    activity_type = activity.get('activityType')
+    if isinstance(activity_type, dict):
+        projected['activityType'] = {'typeKey': activity_type.get('typeKey')}
+    elif isinstance(activity.get('activity_type'), str):
+        # Columnar exports carry the already flattened activity_type
+        projected['activityType'] = {'typeKey': activity['activity_type']}
+    else:
+        projected['activityType'] = None
+    return projected
+
+
+def ingest_activity_stream(byte_chunks, archive=None):
+    """Walk an activity export element by element into projected column buffers.
+
+    No intermediate list of every record or DataFrame is ever built. When an
+    archive is given, every raw record is written to it unchanged.
+    """
+    return ingest_activities(
+        (activity for activity in iter_json_array(byte_chunks) if isinstance(activity, dict)), archive
+    )
+
+
+def ingest_activities(activities, archive=None):
+    """Project already parsed activities (e.g. from the Garmin API) into column buffers"""
+    buffers = ColumnBuffers()
+    for activity in activities:
+        if archive is not None:
+            write_raw_record(archive, activity)
+        buffers.append(project_activity(activity))
+    return buffers.columns
@@ -0,0 +1,34 @@
+from modules.charts.musclemap.musclemap_load import build_strength_index
+from modules.goal_matrix import GoalMatrix
+from modules.rollups import Rollups
+from modules.time_index import TimeIndex, sort_by_time
+
+
+class Dataset:
+    """A parsed activity frame together with the views derived from it at ingest.
+
+    The frame is kept sorted by startTimeLocal, so date ranges are answered
+    by the time index as positional slices instead of boolean masks.
+    """
+
+    def __init__(self, frame, version):
+        if 'startTimeLocal' in frame.columns:
+            frame = sort_by_time(frame)
+            self.time_index = TimeIndex(frame['startTimeLocal'].to_numpy())
+        else:
+            self.time_index = TimeIndex([])
+        self.frame = frame
+        self.version = version
+        self.rollups = Rollups(frame.iloc[:len(self.time_index)])
+        self.goals = GoalMatrix(frame, self.time_index)
+        self.nbytes = int(frame.memory_usage(index=True, deep=True).sum()) + self.goals.nbytes
+
+        if 'summarizedExerciseSets' in frame.columns and len(self.time_index):
+            dated = frame.iloc[:len(self.time_index)][['startTimeLocal', 'summarizedExerciseSets']]
+            self.strength = build_strength_index(dated.to_dict('records'))
+        else:
+            self.strength = build_strength_index([])
+
+    def between(self, start_date, end_date):
+        """Return the activities from start_date to end_date, both days inclusive, as a slice of the frame"""
+        return self.frame.iloc[self.time_index.positions(start_date, end_date)]
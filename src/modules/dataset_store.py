@@ -0,0 +1,229 @@
+import os
+import re
+import gzip
+import json
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from modules.atomic_file import atomic_writer
+from modules.dataset import Dataset
+
+DATASET_DIR = os.path.join('data', 'cache', 'datasets')
+MAX_CACHED_DATASETS = 8
+MAX_CACHE_BYTES = 512 * 2 ** 20
+
+_DATASET_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def is_valid_dataset_id(dataset_id):
+    return isinstance(dataset_id, str) and bool(_DATASET_ID_PATTERN.match(dataset_id))
+
+
+def validate_dataset_id(dataset_id):
+    """Raise ValueError unless dataset_id is one of our ids, since it ends up in file paths"""
+    if not is_valid_dataset_id(dataset_id):
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+
+
+class DatasetStore:
+    """Server-side home of the parsed activity datasets.
+
+    The browser only keeps a small reference of the form
+    {'dataset_id': ..., 'version': ...}. Datasets are held in memory and their
+    frames mirrored to disk, so they survive server restarts and can be
+    picked up by other worker processes.
+
+    The in-memory copies form a least recently used cache bounded by
+    max_datasets entries and max_bytes of frame memory. Evicted datasets
+    are decoded from disk again the next time they are asked for.
+    """
+
+    def __init__(self, directory=DATASET_DIR, max_datasets=MAX_CACHED_DATASETS, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_datasets = max_datasets
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @staticmethod
+    def new_dataset_id():
+        return uuid.uuid4().hex
+
+    def _path(self, dataset_id):
+        validate_dataset_id(dataset_id)
+        return os.path.join(self.directory, f"{dataset_id}.pkl")
+
+    def _archive_path(self, dataset_id):
+        return self._path(dataset_id)[:-len('.pkl')] + '.raw.jsonl.gz'
+
+    def _cache(self, dataset_id, dataset):
+        """Insert a dataset as most recently used and evict old ones beyond the limits; needs the lock"""
+        previous = self._datasets.pop(dataset_id, None)
+        if previous is not None:
+            self._cached_bytes -= previous.nbytes
+        self._datasets[dataset_id] = dataset
+        self._cached_bytes += dataset.nbytes
+
+        # The newest dataset always stays, even if it alone exceeds the cap
+        while len(self._datasets) > 1 and (len(self._datasets) > self.max_datasets or
+                                           self._cached_bytes > self.max_bytes):
+            _, evicted = self._datasets.popitem(last=False)
+            self._cached_bytes -= evicted.nbytes
+
+    def _cached(self, dataset_id):
+        """Return a cached dataset and mark it as most recently used; needs the lock"""
+        dataset = self._datasets.get(dataset_id)
+        if dataset is not None:
+            self._datasets.move_to_end(dataset_id)
+        return dataset
+
+    def put(self, dataset_id, frame):
+        """Store a new version of a dataset and return the reference for the browser"""
+        path = self._path(dataset_id)
+        # Built before pickling so the mirrored frame is already sorted by time
+        dataset = Dataset(frame, time.time_ns())
+
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_writer(path) as f:
+            pickle.dump({'version': dataset.version, 'frame': dataset.frame}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._cache(dataset_id, dataset)
+
+        return {'dataset_id': dataset_id, 'version': dataset.version}
+
+    def get(self, ref):
+        """Return the dataset for a browser reference, or None if it is unknown"""
+        if not ref or not isinstance(ref, dict):
+            return None
+
+        dataset_id = ref.get('dataset_id')
+        version = ref.get('version')
+
+        with self._lock:
+            cached = self._cached(dataset_id)
+        if cached is not None and cached.version >= (version or 0):
+            return cached
+
+        # Charts triggered by the same store update wait here for a single decode
+        with self._load_lock:
+            with self._lock:
+                cached = self._cached(dataset_id)
+            if cached is not None and cached.version >= (version or 0):
+                return cached
+
+            try:
+                with open(self._path(dataset_id), 'rb') as f:
+                    stored = pickle.load(f)
+            except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+                print(f"Error loading dataset {dataset_id}: {e}")
+                return cached
+
+            dataset = Dataset(stored['frame'], stored['version'])
+            with self._lock:
+                self._cache(dataset_id, dataset)
+            return dataset
+
+    @contextmanager
+    def archive_writer(self, dataset_id, append=False):
+        """Open the gzip-compressed JSON Lines archive that keeps the full raw records.
+
+        Records are written to a temporary file first. Without append it then
+        replaces the previous archive, with append it is added to the archive
+        as a new gzip member. An interrupted sync never leaves a truncated
+        member behind.
+        """
+        path = self._archive_path(dataset_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+                yield archive
+            if append:
+                with open(tmp_path, 'rb') as member:
+                    self.append_archive_member(dataset_id, member.read())
+            else:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def append_archive_member(self, dataset_id, member):
+        """Append an already gzip-compressed block of raw records to the archive"""
+        path = self._archive_path(dataset_id)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'ab') as archive:
+            archive.write(member)
+
+    def iter_raw_records(self, ref):
+        """Yield the archived raw records of a dataset, keeping only the latest copy of each activity"""
+        if not ref or not isinstance(ref, dict):
+            return
+
+        try:
+            path = self._archive_path(ref.get('dataset_id'))
+        except ValueError:
+            return
+        if not os.path.exists(path):
+            return
+
+        last_line_by_id = {}
+        lines_without_id = set()
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line_number, line in enumerate(archive):
+                activity_id = json.loads(line).get('activityId')
+                if activity_id is None:
+                    lines_without_id.add(line_number)
+                else:
+                    last_line_by_id[activity_id] = line_number
+        latest_lines = set(last_line_by_id.values()) | lines_without_id
+
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line_number, line in enumerate(archive):
+                if line_number in latest_lines:
+                    yield json.loads(line)
+
+    def delete(self, ref):
+        if not ref or not isinstance(ref, dict):
+            return
+
+        dataset_id = ref.get('dataset_id')
+        with self._lock:
+            evicted = self._datasets.pop(dataset_id, None)
+            if evicted is not None:
+                self._cached_bytes -= evicted.nbytes
+        for path_for in (self._path, self._archive_path):
+            try:
+                os.remove(path_for(dataset_id))
+            except (OSError, ValueError):
+                pass
+
+
+def write_raw_record(archive, activity):
+    archive.write(json.dumps(activity))
+    archive.write('\n')
+
+
+DATASET_STORE = DatasetStore()
+
+
+def get_dataset_id(ref):
+    """Reuse the dataset id of an existing reference or start a new one"""
+    if ref and isinstance(ref, dict) and ref.get('dataset_id'):
+        return ref['dataset_id']
+    return DatasetStore.new_dataset_id()
+
+
+def load_dataset(ref):
+    return DATASET_STORE.get(ref)
+
+
+def load_frame(ref):
+    dataset = DATASET_STORE.get(ref)
+    return dataset.frame if dataset is not None else None
@@ -0,0 +1,104 @@
+import os
+import glob
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from garminconnect import GarminConnectConnectionError, GarminConnectTooManyRequestsError
+
+FIXTURE_DIR = os.path.join('data', 'activities')
+GARMIN_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def load_fixture_activities(directory=FIXTURE_DIR):
+    """Load the example exports, de-duplicated by activityId and sorted newest first like the API"""
+    activities = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for activity in data if isinstance(data, list) else [data]:
+            activities[activity.get('activityId')] = activity
+
+    return sorted(activities.values(), key=lambda activity: activity.get('startTimeGMT') or '', reverse=True)
+
+
+def synthetic_activities(count, templates=None, seed=0, newest=None, spacing_hours=9):
+    """Generate count activities newest first by cycling through template activities.
+
+    Every copy gets its own activityId and timestamps, spaced spacing_hours
+    apart with a little random jitter, so the result behaves like a long
+    training history.
+    """
+    templates = templates or load_fixture_activities()
+    if not templates:
+        raise ValueError("Synthetic activities need at least one template activity")
+
+    rng = random.Random(seed)
+    newest = newest or datetime(2024, 12, 31, 18, 0, 0)
+    activities = []
+
+    for i in range(count):
+        template = templates[i % len(templates)]
+        start_gmt = newest - timedelta(hours=i * spacing_hours + rng.random())
+        start_local = start_gmt + timedelta(hours=1)
+
+        activity = dict(template)
+        activity['activityId'] = 10_000_000_000 + count - i
+        activity['startTimeGMT'] = start_gmt.strftime(GARMIN_TIME_FORMAT)
+        activity['startTimeLocal'] = start_local.strftime(GARMIN_TIME_FORMAT)
+        activities.append(activity)
+
+    return activities
+
+
+class FakeGarmin:
+    """Local stand-in for garminconnect.Garmin serving activity pages from memory.
+
+    Every request sleeps for latency plus up to jitter seconds. error_rate
+    and throttle_rate are the probabilities that a page request fails with a
+    connection error or a 429 throttling error. Logging in with session_data
+    skips the simulated credential handshake, like the real client.
+    """
+
+    def __init__(self, email=None, password=None, activities=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, seed=None, session_data=None):
+        self.username = email
+        self.password = password
+        self.session_data = session_data
+        self.activities = activities if activities is not None else load_fixture_activities()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.request_count = 0
+        self.login_count = 0
+        self.session_login_count = 0
+        self._rng = random.Random(seed)
+
+    def _simulate_request(self):
+        self.request_count += 1
+        delay = self.latency + self.jitter * self._rng.random()
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = self._rng.random()
+        if roll < self.throttle_rate:
+            raise GarminConnectTooManyRequestsError("Too many requests (simulated)")
+        if roll < self.throttle_rate + self.error_rate:
+            raise GarminConnectConnectionError("Connection error (simulated)")
+
+    def login(self):
+        if self.session_data and self.session_data.get('display_name') == self.username:
+            self.session_login_count += 1
+            return True
+
+        self.login_count += 1
+        if self.latency > 0:
+            # The credential handshake takes several round trips
+            time.sleep(3 * self.latency)
+        self.session_data = {'display_name': self.username, 'SESSIONID': f"fake-{self._rng.getrandbits(64):016x}"}
+        return True
+
+    def get_activities(self, start, limit):
+        self._simulate_request()
+        return self.activities[start:start + limit]
@@ -0,0 +1,115 @@
+import os
+import json
+import base64
+import hashlib
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from garminconnect import (GarminConnectAuthenticationError, GarminConnectConnectionError,
+                           GarminConnectTooManyRequestsError)
+from modules.atomic_file import write_atomic
+from modules.garmin_sync import create_garmin_client
+
+SESSION_DIR = os.path.join('data', 'cache', 'sessions')
+SESSION_MAX_AGE = 30 * 24 * 3600  # seconds before a cached session is dropped without asking Garmin
+KDF_ITERATIONS = 480_000
+SALT_SIZE = 16
+
+
+class SessionCache:
+    """Authenticated Garmin sessions kept on disk, one encrypted file per account.
+
+    Files are named after a hash of the username and encrypted with a key
+    derived from the account password, so a session can only be read back
+    with the credentials that created it.
+    """
+
+    def __init__(self, directory=SESSION_DIR, max_age=SESSION_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+
+    def _path(self, username):
+        account = hashlib.sha256((username or '').strip().lower().encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{account}.session")
+
+    @staticmethod
+    def _fernet(password, salt):
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=KDF_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(kdf.derive((password or '').encode('utf-8'))))
+
+    def load(self, username, password):
+        """Return the cached session data of an account, or None if there is no usable session"""
+        try:
+            with open(self._path(username), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        salt, token = content[:SALT_SIZE], content[SALT_SIZE:]
+        try:
+            return json.loads(self._fernet(password, salt).decrypt(token, ttl=self.max_age))
+        except (InvalidToken, ValueError):
+            self.invalidate(username)
+            return None
+
+    def store(self, username, password, session_data):
+        if not session_data:
+            return
+
+        salt = os.urandom(SALT_SIZE)
+        token = self._fernet(password, salt).encrypt(json.dumps(session_data).encode('utf-8'))
+
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self._path(username), salt + token, mode=0o600)
+
+    def invalidate(self, username):
+        try:
+            os.remove(self._path(username))
+        except OSError:
+            pass
+
+
+SESSION_CACHE = SessionCache()
+
+
+def login_garmin(username, password, cache=SESSION_CACHE, use_cache=True):
+    """Return a logged-in Garmin client and whether it reuses a cached session.
+
+    A cached session only needs the cheap session check instead of the full
+    credential handshake. If Garmin refreshes the session during that check,
+    the refreshed one is cached. Sessions that fail the check are dropped and
+    replaced by a full login, whose session is cached for the next fetch.
+    """
+    session_data = cache.load(username, password) if use_cache else None
+    if session_data:
+        api = create_garmin_client(username, password, session_data=session_data)
+        try:
+            api.login()
+            # Stale cookies are silently replaced by a fresh login, keep that session for the next fetch
+            if api.session_data and api.session_data != session_data:
+                cache.store(username, password, api.session_data)
+            return api, True
+        except GarminConnectTooManyRequestsError:
+            raise
+        except (GarminConnectAuthenticationError, GarminConnectConnectionError, KeyError) as e:
+            print(f"Cached Garmin session rejected, logging in again: {e}")
+            cache.invalidate(username)
+
+    api = create_garmin_client(username, password)
+    api.login()
+    cache.store(username, password, api.session_data)
+    return api, False
+
+
+def run_with_garmin_session(username, password, action, cache=SESSION_CACHE):
+    """Run action(api) with a logged-in client, repeating it once after a full login if Garmin rejects a cached session"""
+    api, from_cache = login_garmin(username, password, cache)
+    try:
+        return action(api)
+    except GarminConnectAuthenticationError:
+        if not from_cache:
+            raise
+        print("Cached Garmin session expired, logging in again")
+        cache.invalidate(username)
+        api, _ = login_garmin(username, password, cache, use_cache=False)
+        return action(api)
@@ -0,0 +1,233 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from garminconnect import Garmin, GarminConnectConnectionError, GarminConnectTooManyRequestsError
+
+PAGE_SIZE = 100
+MAX_CONCURRENT_PAGES = 4
+# Partial datasets are published after 1, 2, 4, 8, ... pages, so the rebuilds add up to about twice the final one
+PUBLISH_GROWTH = 2
+
+REQUESTS_PER_SECOND = 5.0
+REQUEST_BURST = 8
+MIN_REQUESTS_PER_SECOND = 0.2
+MAX_PAGE_RETRIES = 5
+RETRY_BASE_DELAY = 1.0  # seconds before the first retry, doubled on every further attempt
+RETRY_MAX_DELAY = 60.0
+
+RETRYABLE_ERRORS = (GarminConnectConnectionError, GarminConnectTooManyRequestsError, requests.exceptions.RequestException)
+
+
+def create_garmin_client(username, password, session_data=None):
+    """Create the Garmin API client, or the local stand-in when PFIFA_FAKE_GARMIN is set.
+
+    With session_data the client logs in by reusing that session instead of
+    the credentials. PFIFA_FAKE_GARMIN_LATENCY (seconds per request) makes
+    the stand-in behave more like the real service.
+    """
+    if os.environ.get('PFIFA_FAKE_GARMIN'):
+        from modules.garmin_fake import FakeGarmin, load_fixture_activities
+        return FakeGarmin(
+            username,
+            password,
+            activities=load_fixture_activities(),
+            latency=float(os.environ.get('PFIFA_FAKE_GARMIN_LATENCY', 0)),
+            session_data=session_data
+        )
+    return Garmin(username, password, session_data=session_data)
+
+
+class TokenBucket:
+    """Thread-safe token bucket pacing the page requests sent to Garmin.
+
+    Each throttling response halves the refill rate and empties the bucket,
+    every successful request wins back a twentieth of the original rate.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=REQUEST_BURST, min_rate=MIN_REQUESTS_PER_SECOND):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+
+    def succeeded(self):
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def fetch_activity_page(api, start, limit, bucket=None, max_retries=MAX_PAGE_RETRIES, on_timing=None, stop=None):
+    """Fetch one page of activities, retrying throttled and failed requests with exponential backoff.
+
+    Once the stop event is set no further attempt is made and None is
+    returned, a running backoff wait ends early. on_timing is called with a dict holding the page start, its size, the
+    number of attempts, the duration of the successful request and the total
+    time spent on the page including retries.
+    """
+    started = time.perf_counter()
+    attempt = 0
+
+    while True:
+        if stop is not None and stop.is_set():
+            return None
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+
+        request_started = time.perf_counter()
+        try:
+            batch = api.get_activities(start, limit)
+        except RETRYABLE_ERRORS as e:
+            if bucket is not None and isinstance(e, GarminConnectTooManyRequestsError):
+                bucket.throttled()
+            if attempt > max_retries:
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            print(f"Page at {start} failed ({e}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            if stop is not None:
+                stop.wait(delay)
+            else:
+                time.sleep(delay)
+            continue
+
+        finished = time.perf_counter()
+        if bucket is not None:
+            bucket.succeeded()
+        if on_timing is not None:
+            on_timing({
+                'start': start,
+                'size': len(batch or []),
+                'attempts': attempt,
+                'request_seconds': finished - request_started,
+                'total_seconds': finished - started,
+            })
+        return batch
+
+
+def summarize_page_timings(timings):
+    """Condense per-page timings into page count, retries and latency percentiles"""
+    if not timings:
+        return None
+
+    latencies = sorted(timing['request_seconds'] for timing in timings)
+    totals = [timing['total_seconds'] for timing in timings]
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    return {
+        'pages': len(timings),
+        'retries': sum(timing['attempts'] - 1 for timing in timings),
+        'p50_seconds': percentile(0.5),
+        'p95_seconds': percentile(0.95),
+        'max_seconds': latencies[-1],
+        'retry_wait_seconds': sum(totals) - sum(latencies),
+    }
+
+
+def get_sync_marker(activities):
+    """Return the newest startTimeGMT/activityId pair found in a list of activities"""
+    newest = None
+    for activity in activities or []:
+        start_time = activity.get('startTimeGMT')
+        if not start_time:
+            continue
+        if newest is None or start_time > newest['startTimeGMT']:
+            newest = {'startTimeGMT': start_time, 'activityId': activity.get('activityId')}
+    return newest
+
+
+def is_known_activity(activity, sync_marker):
+    """Check whether an activity is at or before the last synced activity"""
+    if activity.get('activityId') == sync_marker.get('activityId'):
+        return True
+    start_time = activity.get('startTimeGMT')
+    return bool(start_time) and start_time < sync_marker['startTimeGMT']
+
+
+def iter_activity_pages(api, page_size=PAGE_SIZE, max_workers=MAX_CONCURRENT_PAGES, start=0, bucket=None,
+                        on_timing=None):
+    """Yield activity pages in order while keeping up to max_workers page requests in flight.
+
+    Pages are fetched from offset start on through fetch_activity_page, paced
+    by the token bucket if one is given. Iteration stops at the first short or
+    empty page. Requests already issued for pages past that point are
+    cancelled or discarded, and running ones stop retrying.
+    """
+    max_workers = max(1, int(max_workers))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    stop = threading.Event()
+    pending = deque()
+    next_start = start
+
+    def submit_next_page():
+        nonlocal next_start
+        pending.append(executor.submit(fetch_activity_page, api, next_start, page_size, bucket,
+                                       on_timing=on_timing, stop=stop))
+        next_start += page_size
+
+    try:
+        for _ in range(max_workers):
+            submit_next_page()
+
+        while pending:
+            batch = pending.popleft().result()
+            if not batch:
+                return
+
+            yield batch
+
+            if len(batch) < page_size:
+                return
+            submit_next_page()
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_new_activity_pages(api, sync_marker, page_size=PAGE_SIZE, max_workers=1, start=0, bucket=None,
+                            on_timing=None):
+    """Yield the new activities of each page until the first already known activity.
+
+    Garmin returns activities newest first, so everything after the first
+    known activity has been synced before. A delta sync rarely needs more
+    than one page, which is why pages are requested one at a time by default.
+    """
+    for batch in iter_activity_pages(api, page_size, max_workers, start, bucket, on_timing):
+        new_activities = []
+        for activity in batch:
+            if is_known_activity(activity, sync_marker):
+                if new_activities:
+                    yield new_activities
+                return
+            new_activities.append(activity)
+        yield new_activities
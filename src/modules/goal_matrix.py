@@ -0,0 +1,56 @@
+import numpy as np
+from modules.metrics import GOAL_METRICS, METRIC_DTYPE, default_goals
+
+ALMOST_REACHED = 0.75  # share of a goal that counts as almost reached
+
+# Goal status codes, in the order of the reached / almost / not reached counts
+REACHED, ALMOST, NOT_REACHED, MISSING = 0, 1, 2, -1
+
+
+def classify_goals(values, goals):
+    """Goal status of every value, goals broadcast against the last axis; missing values get MISSING"""
+    status = np.where(values >= goals, REACHED, np.where(values >= ALMOST_REACHED * goals, ALMOST, NOT_REACHED))
+    status[np.isnan(values)] = MISSING
+    return status
+
+
+class GoalMatrix:
+    """Display-unit values of every goal metric as one dense activity x metric array.
+
+    Rows follow the dataset's time order, so a date range is a slice of
+    contiguous rows from the time index, and a goal change reclassifies
+    the whole slice with one comparison against a goal vector.
+    """
+
+    def __init__(self, frame, time_index, metrics=GOAL_METRICS):
+        self.metrics = list(metrics)
+        self.columns = {metric: i for i, metric in enumerate(self.metrics)}
+        self.time_index = time_index
+
+        rows = len(time_index)
+        self.values = np.full((rows, len(self.metrics)), np.nan, dtype=METRIC_DTYPE)
+        for metric, i in self.columns.items():
+            if metric in frame.columns:
+                self.values[:, i] = frame[metric].iloc[:rows].to_numpy(dtype=METRIC_DTYPE, na_value=np.nan)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def between(self, start_date, end_date):
+        """Rows of the activities from start_date to end_date, both days inclusive"""
+        return self.values[self.time_index.positions(start_date, end_date)]
+
+    def column(self, metric, start_date, end_date):
+        """Values of one metric from start_date to end_date, aligned with Dataset.between"""
+        return self.between(start_date, end_date)[:, self.columns[metric]]
+
+    def goal_vector(self, goals):
+        defaults = default_goals()
+        return np.array([goals.get(metric, defaults.get(metric)) for metric in self.metrics], dtype=METRIC_DTYPE)
+
+    def status_counts(self, goals, start_date, end_date):
+        """Activities that reached, almost reached and did not reach each goal, as {metric: (reached, almost, not)}"""
+        status = classify_goals(self.between(start_date, end_date), self.goal_vector(goals or {}))
+        counts = np.stack([(status == code).sum(axis=0) for code in (REACHED, ALMOST, NOT_REACHED)], axis=1)
+        return dict(zip(self.metrics, counts.tolist()))
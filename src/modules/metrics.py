@@ -0,0 +1,73 @@
+METRIC_DTYPE = 'float32'
+
+# Every metric declares its label, display unit, dtype, the factor that turns
+# Garmin's raw value into the display unit, its number format and its default
+# goal. Metrics without a default goal are not offered in the goal charts.
+# Frames are converted to display units once at ingest, charts read them as is.
+METRICS = {
+    'activeSets': {'label': 'Active Sets', 'unit': 'sets', 'goal': 15},
+    'activityTrainingLoad': {'label': 'Training Load', 'unit': 'points', 'goal': None},
+    'aerobicTrainingEffect': {'label': 'Aerobic Training Effect', 'unit': 'points', 'goal': 3},
+    'anaerobicTrainingEffect': {'label': 'Anaerobic Training Effect', 'unit': 'points', 'goal': 1},
+    'averageHR': {'label': 'Average Heart Rate', 'unit': 'bpm', 'goal': 140},
+    'averageSpeed': {'label': 'Average Speed', 'unit': 'km/h', 'factor': 3.6, 'goal': 10},  # from m/s
+    'calories': {'label': 'Calories', 'unit': 'kcal', 'format': '.0f', 'goal': 500},
+    'distance': {'label': 'Distance (km)', 'short_label': 'Distance', 'unit': 'km', 'factor': 1 / 1000,
+                 'format': '.2f', 'goal': 5},  # from meters
+    'duration': {'label': 'Duration (minutes)', 'short_label': 'Duration', 'unit': 'minutes', 'factor': 1 / 60,
+                 'goal': 60},  # from seconds
+    'elevationGain': {'label': 'Elevation Gain', 'unit': 'm', 'goal': 100},
+    'elevationLoss': {'label': 'Elevation Loss', 'unit': 'm', 'goal': 100},
+    'maxElevation': {'label': 'Max Elevation', 'unit': 'm', 'goal': 500},
+    'maxHR': {'label': 'Max Heart Rate', 'unit': 'bpm', 'goal': 180},
+    'maxSpeed': {'label': 'Max Speed', 'unit': 'km/h', 'factor': 3.6, 'goal': 15},  # from m/s
+    'maxTemperature': {'label': 'Max Temperature', 'unit': '°C', 'goal': 25},
+    'minTemperature': {'label': 'Min Temperature', 'unit': '°C', 'goal': 15},
+    'moderateIntensityMinutes': {'label': 'Moderate Intensity Minutes', 'unit': 'minutes', 'goal': 30},
+    'movingDuration': {'label': 'Moving Duration', 'unit': 'minutes', 'factor': 1 / 60, 'goal': 15},  # from seconds
+    'steps': {'label': 'Steps', 'unit': 'steps', 'format': '.0f', 'goal': 10000},
+    'totalReps': {'label': 'Total Reps', 'unit': 'reps', 'format': '.0f', 'goal': 150},
+    'totalSets': {'label': 'Total Sets', 'unit': 'sets', 'format': '.0f', 'goal': 15},
+    'vigorousIntensityMinutes': {'label': 'Vigorous Intensity Minutes', 'unit': 'minutes', 'goal': 20},
+    'waterEstimated': {'label': 'Water Loss (ml)', 'unit': 'ml', 'goal': 500},
+}
+
+for _config in METRICS.values():
+    _config.setdefault('short_label', _config['label'])
+    _config.setdefault('dtype', METRIC_DTYPE)
+    _config.setdefault('factor', 1)
+    _config.setdefault('format', '.1f')
+
+METRIC_COLUMNS = sorted(METRICS)
+GOAL_METRICS = sorted((metric for metric, config in METRICS.items() if config['goal'] is not None),
+                      key=lambda metric: METRICS[metric]['label'])
+
+
+def metric_label(metric):
+    return METRICS[metric]['label'] if metric in METRICS else metric.replace('_', ' ').title()
+
+
+def metric_unit(metric):
+    return METRICS[metric]['unit'] if metric in METRICS else ''
+
+
+def default_goals():
+    """Return default goals for each metric, in display units"""
+    return {metric: METRICS[metric]['goal'] for metric in GOAL_METRICS}
+
+
+def to_display_units(df):
+    """Scale raw Garmin metric columns into display units in place, one vectorized multiply per metric"""
+    for metric, config in METRICS.items():
+        if metric in df.columns and config['factor'] != 1:
+            df[metric] = (df[metric].astype('float64') * config['factor']).astype(config['dtype'])
+    return df
+
+
+def to_source_units(df):
+    """Return a copy of a display-unit frame with the metric columns scaled back to Garmin's raw units"""
+    df = df.copy()
+    for metric, config in METRICS.items():
+        if metric in df.columns and config['factor'] != 1:
+            df[metric] = df[metric].astype('float64') / config['factor']
+    return df
@@ -0,0 +1,203 @@
+from datetime import date, timedelta
+import threading
+import numpy as np
+import pandas as pd
+from modules.time_index import TimeIndex
+
+ROLLUP_PERIODS = ('day', 'week', 'month')
+ROLLUP_STATS = ('count', 'sum', 'sumsq', 'min', 'max')
+ACTIVITY_COUNT = 'activities'  # pseudo-metric of 1 per activity, its sum is the number of activities
+
+PRESET_RANGES = {
+    7: 'Last 7 days',
+    30: 'Last 30 days',
+    90: 'Last 90 days',
+    365: 'Last 365 days',
+}
+MAX_CACHED_RANGES = 64
+
+
+def preset_range(days, today=None):
+    """Return the ISO start and end date of the last days days, today included"""
+    today = today or date.today()
+    return (today - timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+def period_starts(times, period):
+    """Map datetimes onto the first day of their day, ISO week (Monday) or month"""
+    days = times.dt.floor('D')
+    if period == 'day':
+        return days
+    if period == 'week':
+        return days - pd.to_timedelta(days.dt.weekday, unit='D')
+    if period == 'month':
+        return days.dt.to_period('M').dt.start_time
+    raise ValueError(f"Unknown rollup period: {period!r}")
+
+
+def whole_periods(first_day, last_day, period):
+    """First day of the first whole week or month from first_day to last_day and the day after the last one"""
+    if period == 'week':
+        # Day 0 of datetime64 (1970-01-01) is a Thursday, so Monday is 3 days after a multiple of 7
+        start = first_day + (-(first_day.astype('int64') + 3)) % 7
+        end = last_day + 1
+        return start, end - (end.astype('int64') + 3) % 7
+    start = first_day.astype('datetime64[M]')
+    if start.astype('datetime64[D]') < first_day:
+        start += 1
+    return start.astype('datetime64[D]'), (last_day + 1).astype('datetime64[M]').astype('datetime64[D]')
+
+
+def range_key(start_date, end_date):
+    return str(start_date)[:10] if start_date else None, str(end_date)[:10] if end_date else None
+
+
+def build_rollup_table(frame, period, metrics):
+    """Aggregate dated activities into one row per period and activity type.
+
+    Columns are (stat, metric) pairs for every stat in ROLLUP_STATS; counts
+    only include activities where the metric is present.
+    """
+    values = frame[metrics].astype('float64')
+    values[ACTIVITY_COUNT] = 1.0
+    keys = [
+        period_starts(frame['startTimeLocal'], period).rename('period'),
+        frame['activity_type'].astype(str).rename('activity_type'),
+    ]
+
+    grouped = values.groupby(keys, sort=True)
+    return pd.concat({
+        'count': grouped.count(),
+        'sum': grouped.sum(),
+        'sumsq': (values ** 2).groupby(keys, sort=True).sum(),
+        'min': grouped.min(),
+        'max': grouped.max(),
+    }, axis=1)
+
+
+def combine_rollup_rows(rows):
+    """Merge rollup rows of any periods into totals per activity type"""
+    def by_type(stat):
+        return rows[stat].groupby(level='activity_type', sort=True)
+
+    return pd.concat({
+        'count': by_type('count').sum(),
+        'sum': by_type('sum').sum(),
+        'sumsq': by_type('sumsq').sum(),
+        'min': by_type('min').min(),
+        'max': by_type('max').max(),
+    }, axis=1)
+
+
+def metric_means(totals):
+    """Mean of every metric over all activity types of a combined rollup"""
+    counts = totals['count'].sum()
+    return totals['sum'].sum() / counts.where(counts > 0)
+
+
+class Rollups:
+    """Daily, ISO-weekly and monthly rollup tables of a dataset, built once at ingest.
+
+    A date range is answered from whole months plus the days at either edge,
+    so a multi-year range reads a few hundred rows instead of every activity.
+    The preset ranges ending today are combined up front.
+    """
+
+    def __init__(self, frame, today=None):
+        metrics = [column for column in frame.columns if pd.api.types.is_float_dtype(frame[column])]
+        if not {'startTimeLocal', 'activity_type'} <= set(frame.columns):
+            frame = pd.DataFrame({
+                'startTimeLocal': pd.Series(dtype='datetime64[ns]'),
+                'activity_type': pd.Series(dtype=str),
+                **{metric: frame[metric].iloc[:0] for metric in metrics},
+            })
+
+        self.tables = {}
+        self.indexes = {}
+        for period in ROLLUP_PERIODS:
+            table = build_rollup_table(frame, period, metrics)
+            self.tables[period] = table
+            self.indexes[period] = TimeIndex(table.index.get_level_values('period').to_numpy())
+
+        self._ranges = {}
+        self._means = {}
+        self._cache_lock = threading.Lock()
+        for days in PRESET_RANGES:
+            self.between(*preset_range(days, today))
+
+    def rows(self, period, start_date=None, end_date=None):
+        """Rollup rows of one period whose period starts from start_date to end_date, both inclusive"""
+        return self.tables[period].iloc[self.indexes[period].positions(start_date, end_date)]
+
+    def between(self, start_date, end_date):
+        """Totals per activity type from start_date to end_date, both days inclusive"""
+        key = range_key(start_date, end_date)
+        with self._cache_lock:
+            cached = self._ranges.get(key)
+        if cached is not None:
+            return cached
+
+        totals = combine_rollup_rows(self._range_rows(*key))
+        with self._cache_lock:
+            if key not in self._ranges and len(self._ranges) >= MAX_CACHED_RANGES + len(PRESET_RANGES):
+                # Presets come first in insertion order, drop the oldest other range
+                self._ranges.pop(list(self._ranges)[len(PRESET_RANGES)])
+            self._ranges[key] = totals
+        return totals
+
+    def means(self, start_date, end_date):
+        """Mean of every metric from start_date to end_date, computed once per range"""
+        key = range_key(start_date, end_date)
+        with self._cache_lock:
+            cached = self._means.get(key)
+        if cached is None:
+            cached = metric_means(self.between(start_date, end_date))
+            with self._cache_lock:
+                if key not in self._means and len(self._means) >= MAX_CACHED_RANGES:
+                    self._means.pop(next(iter(self._means)))
+                self._means[key] = cached
+        return cached
+
+    def buckets(self, period, metric, start_date=None, end_date=None):
+        """Totals of one metric per day, ISO week or month from start_date to end_date over all activity types.
+
+        Whole weeks and months come from their own rollup table and the days
+        at either edge from the daily one, so edge weeks and months only count
+        days within the range. Returns a frame indexed by period start with
+        the metric sum and count and the number of activities.
+        """
+        if period == 'day':
+            rows = self.rows('day', start_date, end_date)
+            keys = rows.index.get_level_values('period')
+        else:
+            rows = self._range_rows(*range_key(start_date, end_date), period=period)
+            keys = period_starts(pd.Series(rows.index.get_level_values('period')), period).to_numpy()
+
+        has_metric = ('sum', metric) in rows.columns
+        totals = pd.DataFrame({
+            'sum': rows[('sum', metric)].to_numpy() if has_metric else np.zeros(len(rows)),
+            'count': rows[('count', metric)].to_numpy() if has_metric else np.zeros(len(rows)),
+            'activities': rows[('sum', ACTIVITY_COUNT)].to_numpy(),
+        })
+        return totals.groupby(keys, sort=True).sum()
+
+    def _range_rows(self, start_day, end_day, period='month'):
+        days = self.indexes['day'].times
+        if not len(days):
+            return self.tables['day'].iloc[:0]
+
+        first_day = np.datetime64(start_day or days[0], 'D')
+        last_day = np.datetime64(end_day or days[-1], 'D')
+        if last_day < first_day:
+            return self.tables['day'].iloc[:0]
+
+        # Whole periods inside the range come from the period's table, the edges from the daily one
+        period_start, period_end = whole_periods(first_day, last_day, period)
+        if period_start >= period_end:
+            return self.rows('day', str(first_day), str(last_day))
+
+        return pd.concat([
+            self.rows('day', str(first_day), str(period_start - 1)) if first_day < period_start else None,
+            self.rows(period, str(period_start), str(period_end - 1)),
+            self.rows('day', str(period_end), str(last_day)) if period_end <= last_day else None,
+        ])
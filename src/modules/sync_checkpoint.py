@@ -0,0 +1,84 @@
+import os
+import gzip
+import json
+import shutil
+import hashlib
+from modules.atomic_file import write_atomic
+from modules.dataset_store import is_valid_dataset_id, validate_dataset_id
+from modules.garmin_sync import PAGE_SIZE
+
+CHECKPOINT_DIR = os.path.join('data', 'cache', 'checkpoints')
+MANIFEST_NAME = 'manifest.json'
+
+
+class SyncCheckpoint:
+    """Completed pages of an unfinished Garmin sync, kept on disk so the sync can resume.
+
+    A checkpoint belongs to one dataset and is only reused by a sync for the
+    same account, sync marker and page size. Every page is stored as its own
+    gzip-compressed JSON Lines file next to a manifest listing the pages and
+    their timings.
+    """
+
+    def __init__(self, dataset_id, account, sync_marker=None, page_size=PAGE_SIZE, directory=CHECKPOINT_DIR):
+        validate_dataset_id(dataset_id)
+
+        self.directory = os.path.join(directory, dataset_id)
+        self.key = {
+            'account': hashlib.sha256((account or '').encode('utf-8')).hexdigest(),
+            'sync_marker': sync_marker,
+            'page_size': page_size,
+        }
+        self.page_size = page_size
+        self.pages = []
+        self.timings = []
+
+    @property
+    def next_start(self):
+        return len(self.pages) * self.page_size
+
+    def load(self):
+        """Read the manifest and return the number of completed pages, discarding checkpoints of another sync"""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        if manifest.get('key') != self.key:
+            self.clear()
+            return 0
+
+        self.pages = manifest.get('pages', [])
+        self.timings = manifest.get('timings', [])
+        return len(self.pages)
+
+    def iter_pages(self):
+        """Yield the raw activities of every completed page in fetch order"""
+        for page_file in list(self.pages):
+            with gzip.open(os.path.join(self.directory, page_file), 'rt', encoding='utf-8') as page:
+                yield [json.loads(line) for line in page]
+
+    def add_page(self, activities, timings=None):
+        """Store a completed page, then record it in the manifest"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        page_file = f"page-{len(self.pages):05d}.jsonl.gz"
+        lines = ''.join(json.dumps(activity) + '\n' for activity in activities)
+        write_atomic(os.path.join(self.directory, page_file), gzip.compress(lines.encode('utf-8')))
+
+        self.pages.append(page_file)
+        if timings is not None:
+            self.timings = list(timings)
+        manifest = {'key': self.key, 'pages': self.pages, 'timings': self.timings}
+        write_atomic(os.path.join(self.directory, MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.pages = []
+        self.timings = []
+
+
+def delete_checkpoint(dataset_id, directory=CHECKPOINT_DIR):
+    if is_valid_dataset_id(dataset_id):
+        shutil.rmtree(os.path.join(directory, dataset_id), ignore_errors=True)
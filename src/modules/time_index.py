@@ -0,0 +1,40 @@
+import numpy as np
+
+TIME_UNIT = 'datetime64[ns]'
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+def _day(date):
+    """Midnight of a date picker value such as '2024-03-01' or '2024-03-01T00:00:00'"""
+    return np.datetime64(str(date)[:10], 'D').astype(TIME_UNIT)
+
+
+class TimeIndex:
+    """Ascending start times answering date ranges with two binary searches.
+
+    The times must already be sorted, with missing times (NaT) at the end,
+    where they are left out of every range.
+    """
+
+    def __init__(self, times):
+        times = np.asarray(times, dtype=TIME_UNIT)
+        self.times = times[:len(times) - int(np.isnat(times).sum())]
+
+    def __len__(self):
+        return len(self.times)
+
+    def positions(self, start_date=None, end_date=None):
+        """Return the slice of rows from the start of start_date to the end of end_date, both days inclusive"""
+        start = np.searchsorted(self.times, _day(start_date), side='left') if start_date else 0
+        end = np.searchsorted(self.times, _day(end_date) + ONE_DAY, side='left') if end_date else len(self.times)
+        return slice(int(start), int(max(start, end)))
+
+
+def sort_by_time(frame, column='startTimeLocal'):
+    """Return the frame sorted by a datetime column with missing times last, skipping the sort if it already is"""
+    times = frame[column]
+    valid = times.notna().to_numpy()
+    valid_count = int(valid.sum())
+    if valid[:valid_count].all() and times.iloc[:valid_count].is_monotonic_increasing:
+        return frame
+    return frame.sort_values(column, kind='stable', na_position='last')
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
-from dash import dcc, html
+from dash import callback_context, dcc, html
+from modules.data_export import EXPORT_FORMATS
 
 def calculate_date_range():
     today = datetime.today()
@@ -7,6 +8,11 @@ def calculate_date_range():
     last_day_last_month = today.replace(day=1) - timedelta(days=1)
     return first_day_last_month, last_day_last_month
 
+def only_triggered_by(prop_ids):
+    """Whether the running callback was triggered by the given 'id.property' inputs and nothing else"""
+    triggered = set(callback_context.triggered_prop_ids)
+    return bool(triggered) and triggered <= set(prop_ids)
+
 def create_data_layout():
     return html.Div([
         html.H1("Load Data"),
@@ -31,7 +37,17 @@ def create_data_layout():
                 html.Label("Garmin Password:", style={'marginRight': '10px'}),
                 dcc.Input(id='garmin-password', type='password', placeholder='Enter your Garmin password', style={'width': '300px'}),
                 html.Br(),
-                html.Button('Fetch Data', id='fetch-button', n_clicks=0, style={'margin-top': '10px'})
+                dcc.Checklist(
+                    id='incremental-sync',
+                    options=[{'label': 'Only fetch activities newer than the last sync', 'value': True}],
+                    value=[True],
+                    inputStyle={"margin-right": "5px"},
+                    style={'margin-top': '10px'}
+                ),
+                html.Button('Fetch Data', id='fetch-button', n_clicks=0, style={'margin-top': '10px'}),
+                html.Button('Cancel', id='cancel-fetch-button', n_clicks=0, style={'display': 'none'}),
+                html.Div(id='fetch-progress', style={'margin-top': '10px', 'color': '#666'}),
+                dcc.Store(id='fetch-partial-data')
             ], id='garmin-login', style={'display': 'block'}),
 
             html.Div(create_upload_section(), id='file-upload', style={'display': 'none'}),
@@ -67,6 +83,28 @@ def create_data_layout():
                 value='all',
                 style={'width': '300px', 'marginBottom': '10px'}
             ),
+            dcc.Dropdown(
+                id='export-format',
+                options=[{'label': config['label'], 'value': export_format}
+                         for export_format, config in EXPORT_FORMATS.items()],
+                value='json',
+                clearable=False,
+                style={'width': '300px', 'marginBottom': '10px'}
+            ),
+            dcc.Dropdown(
+                id='export-activity-types',
+                options=[],
+                multi=True,
+                placeholder='All activity types',
+                style={'width': '300px', 'marginBottom': '10px'}
+            ),
+            dcc.Checklist(
+                id='export-date-filter',
+                options=[{'label': 'Only activities in the selected date range', 'value': True}],
+                value=[],
+                inputStyle={"margin-right": "5px"},
+                style={'marginBottom': '10px'}
+            ),
             html.Button("Download Data", id="btn-download", n_clicks=0,
                         style={'marginRight': '10px'}),
             dcc.Download(id="download-data")
@@ -105,7 +143,7 @@ def create_upload_section():
                 'margin': '10px'
             },
             contents=None,
-            multiple=False
+            multiple=True
         ),
         html.Div(id='upload-status', style={'margin-top': '10px', 'color': 'green'})
     ]
\ No newline at end of file
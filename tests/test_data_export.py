@@ -0,0 +1,48 @@
+import base64
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from modules.data_export import filter_records, write_json, write_npz
+from modules.data_loader import build_activity_frame, ingest_activities, parse_uploaded_exports
+from modules.dataset_store import DatasetStore
+
+
+def garmin_record(activity_id, type_key, day):
+    return {
+        'activityId': activity_id,
+        'activityType': {'typeKey': type_key},
+        'startTimeLocal': f'2024-01-{day:02d} 08:00:00',
+        'startTimeGMT': f'2024-01-{day:02d} 07:00:00',
+        'distance': 10000.0,
+        'duration': 3600.0,
+    }
+
+
+def test_npz_upload_exports_json_filtered_by_type(tmp_path):
+    frame = build_activity_frame(ingest_activities([
+        garmin_record(1, 'cycling', 1),
+        garmin_record(2, 'running', 2),
+        garmin_record(3, 'running', 3),
+    ]))
+    npz = io.BytesIO()
+    write_npz(frame, npz)
+    contents = 'data:application/octet-stream;base64,' + base64.b64encode(npz.getvalue()).decode('ascii')
+
+    uploaded_df, raw_members, skipped = parse_uploaded_exports([contents], ['export.npz'])
+    assert skipped == []
+
+    store = DatasetStore(str(tmp_path))
+    ref = store.put(store.new_dataset_id(), uploaded_df)
+    for member in raw_members:
+        store.append_archive_member(ref['dataset_id'], member)
+
+    buffer = io.BytesIO()
+    write_json(filter_records(store.iter_raw_records(ref), activity_types=['cycling']), buffer)
+    exported = json.loads(buffer.getvalue())
+
+    assert [record['activityId'] for record in exported] == [1]
+    assert exported[0]['activityType']['typeKey'] == 'cycling'